@@ -0,0 +1,242 @@
+"""
+Calibration backtesting over an archive of resolved networks.
+
+Every network JSON with an ``outcomes`` map (``{"H1": true, ...}``) and an
+optional top-level ``analyst`` name is scored in a process pool. For each
+resolved hypothesis, two forecasts are compared with what happened: the
+logistic rule's posterior (Calc Prior) and the node's stated ``likelihood``.
+Brier score, log loss and reliability-diagram bins are reported overall, per
+stated ``SCALE`` label and per analyst.
+
+Per-file results are cached by content hash, so re-running after adding a
+few files only scores the new ones. Files that fail to parse or score are
+reported and skipped; they are not cached, so fixing them is enough.
+
+Usage:
+    python backtest.py archive/ --workers 8 --json report.json
+"""
+import argparse
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from network_model import LABEL_TO_DECIMAL, SCALE, build_graph_from_json, calc_prior, load_parameters
+
+CACHE_VERSION = 1
+EPS = 1e-6
+
+
+# -----------------------------
+# Per-file scoring (runs in worker processes)
+# -----------------------------
+
+def score_file(path):
+    """Return one row per resolved hypothesis in the network at ``path``."""
+    with open(path, "r", encoding="utf-8") as f:
+        net = json.load(f)
+    outcomes = net.get("outcomes") or {}
+    if not outcomes:
+        return []
+    g = build_graph_from_json(net)
+    priors, truth_probs, edge_strengths = load_parameters(net)
+    analyst = net.get("analyst") or "unknown"
+    rows = []
+    for h, outcome in outcomes.items():
+        if outcome is None or h not in g.nodes or g.nodes[h]["group"] != "hypothesis":
+            continue
+        label = g.nodes[h].get("likelihood", "") or ""
+        rows.append({
+            "hypothesis": h,
+            "analyst":    analyst,
+            "label":      label,
+            "computed":   calc_prior(g, h, priors, truth_probs, edge_strengths),
+            "stated":     LABEL_TO_DECIMAL.get(label),
+            "outcome":    1 if outcome else 0,
+        })
+    return rows
+
+
+def _score_or_error(path):
+    """``(rows, None)``, or ``(None, message)`` so one bad file can't abort the pool."""
+    try:
+        return score_file(path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+
+def file_digest(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def save_cache(path, files):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "files": files}, f)
+    os.replace(tmp, path)
+
+
+def collect_rows(paths, cache_path, workers=None):
+    """
+    Score ``paths`` (reusing cached rows for unchanged content) and return
+    ``(rows, n_cached, errors)``: the rows, each with a ``file`` field, how
+    many files were served from the cache, and ``{path: message}`` for the
+    files that could not be scored.
+    """
+    cache = load_cache(cache_path)
+    digests, errors = {}, {}
+    for p in paths:
+        try:
+            digests[p] = file_digest(p)
+        except OSError as e:
+            # Unreadable or vanished since it was listed; skip it like a bad file
+            errors[str(p)] = f"{type(e).__name__}: {e}"
+    paths = [p for p in paths if p in digests]
+    n_cached = sum(d in cache for d in digests.values())
+    todo = sorted({d: p for p, d in digests.items() if d not in cache}.items())
+    failed = {}   # digest → message
+
+    if todo:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(_score_or_error, [p for _, p in todo], chunksize=8)
+                for (digest, _), (rows, error) in zip(todo, results):
+                    if error is None:
+                        cache[digest] = rows
+                    else:
+                        failed[digest] = error
+        finally:
+            # Keep whatever was scored, even if the pool itself broke, and
+            # drop entries for content that is no longer in the archive
+            live = set(digests.values())
+            save_cache(cache_path, {d: r for d, r in cache.items() if d in live})
+
+    rows = []
+    for p in paths:
+        if digests[p] in failed:
+            errors[str(p)] = failed[digests[p]]
+            continue
+        for row in cache[digests[p]]:
+            rows.append({**row, "file": str(p)})
+    return rows, n_cached, errors
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+
+def calibration(forecast, outcome, n_bins=10):
+    """Brier score, log loss and reliability bins for paired arrays."""
+    forecast = np.asarray(forecast, dtype=float)
+    outcome = np.asarray(outcome, dtype=float)
+    if len(forecast) == 0:
+        return {"n": 0}
+    p = np.clip(forecast, EPS, 1 - EPS)
+    bins = np.minimum((forecast * n_bins).astype(int), n_bins - 1)
+    count = np.bincount(bins, minlength=n_bins)
+    sum_f = np.bincount(bins, weights=forecast, minlength=n_bins)
+    sum_o = np.bincount(bins, weights=outcome, minlength=n_bins)
+    reliability = [
+        {
+            "bin": [i / n_bins, (i + 1) / n_bins],
+            "count": int(count[i]),
+            "mean_forecast": float(sum_f[i] / count[i]),
+            "observed_rate": float(sum_o[i] / count[i]),
+        }
+        for i in range(n_bins) if count[i]
+    ]
+    return {
+        "n": int(len(forecast)),
+        "brier": float(np.mean((forecast - outcome) ** 2)),
+        "log_loss": float(-np.mean(outcome * np.log(p) + (1 - outcome) * np.log(1 - p))),
+        "base_rate": float(outcome.mean()),
+        "reliability": reliability,
+    }
+
+
+def summarise(rows, n_bins=10):
+    """Calibration of computed vs stated forecasts, overall / per label / per analyst."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[("overall", "all")].append(row)
+        groups[("label", row["label"] or "(none)")].append(row)
+        groups[("analyst", row["analyst"])].append(row)
+
+    report = {"overall": {}, "label": {}, "analyst": {}}
+    for (kind, name), members in groups.items():
+        entry = {}
+        for source in ("computed", "stated"):
+            pairs = [(r[source], r["outcome"]) for r in members if r[source] is not None]
+            entry[source] = calibration([f for f, _ in pairs], [o for _, o in pairs], n_bins)
+        report[kind][name] = entry
+    report["label"] = {
+        k: report["label"][k]
+        for k in sorted(report["label"], key=lambda k: SCALE.index(k) if k in SCALE else len(SCALE))
+    }
+    return report
+
+
+def _fmt(metrics):
+    if not metrics.get("n"):
+        return f"{'-':>5} {'-':>7} {'-':>8}"
+    return f"{metrics['n']:>5} {metrics['brier']:>7.4f} {metrics['log_loss']:>8.4f}"
+
+
+def print_report(report):
+    header = f"{'group':<32} {'n':>5} {'brier':>7} {'logloss':>8}   {'n':>5} {'brier':>7} {'logloss':>8}"
+    print(f"{'':<32} {'computed posterior':^22}   {'stated likelihood':^22}")
+    print(header)
+    for kind in ("overall", "label", "analyst"):
+        for name, entry in report[kind].items():
+            title = name if kind == "overall" else f"{kind}: {name}"
+            print(f"{title[:32]:<32} {_fmt(entry['computed'])}   {_fmt(entry['stated'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration backtest over resolved networks")
+    parser.add_argument("archive", help="directory of network JSON files")
+    parser.add_argument("--glob", default="*.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--bins", type=int, default=10)
+    parser.add_argument("--cache", default=None, help="cache file (default: <archive>/.backtest_cache.json)")
+    parser.add_argument("--json", default=None, help="also write the full report here")
+    args = parser.parse_args()
+
+    archive = Path(args.archive)
+    cache_path = args.cache or str(archive / ".backtest_cache.json")
+    paths = sorted(p for p in archive.rglob(args.glob) if p.is_file() and p.name != Path(cache_path).name)
+    rows, n_cached, errors = collect_rows(paths, cache_path, args.workers)
+    n_scored = len(paths) - n_cached - len(errors)
+    print(f"{len(paths)} files ({n_scored} newly scored, {n_cached} cached, {len(errors)} failed), "
+          f"{len(rows)} resolved hypotheses")
+    for path, message in errors.items():
+        print(f"  skipped {path}: {message}")
+
+    report = summarise(rows, args.bins)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
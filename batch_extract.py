@@ -0,0 +1,329 @@
+"""
+Resumable bulk narrative → network extraction.
+
+Converts every narrative in a directory (e.g. archived ``*.md`` assessments)
+into validated network JSON, one output file per document:
+
+    python batch_extract.py run archive/ networks/ --concurrency 8 --rate 5
+
+- at most ``--concurrency`` chat completions are in flight at once
+- a token bucket caps the request rate at ``--rate`` per second (``--burst``)
+- transient API errors and invalid JSON are retried with exponential backoff
+- every finished document is appended to ``checkpoint.jsonl`` in the output
+  directory, so re-running the same command resumes where a crash stopped
+
+For offline testing, start the bundled stub and point the job at it:
+
+    python batch_extract.py stub --port 8089
+    python batch_extract.py run archive/ networks/ --base-url http://127.0.0.1:8089/v1
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import openai
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from extraction import MODEL, TEMPERATURE, InvalidNetwork, build_prompt, parse_response
+
+CHECKPOINT_NAME = "checkpoint.jsonl"
+
+
+# -----------------------------
+# Rate limiting
+# -----------------------------
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate!r}")
+        if capacity is not None and not capacity >= 1:
+            raise ValueError(f"capacity must be at least one token, got {capacity!r}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# -----------------------------
+# Checkpointing
+# -----------------------------
+
+def file_digest(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def load_checkpoint(out_dir):
+    """Latest record per document from ``checkpoint.jsonl`` (ignores a torn last line)."""
+    done = {}
+    path = Path(out_dir) / CHECKPOINT_NAME
+    if not path.exists():
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["file"]] = record
+    return done
+
+
+def append_checkpoint(out_dir, record):
+    with open(Path(out_dir) / CHECKPOINT_NAME, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_json_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def output_path(in_dir, out_dir, doc):
+    return Path(out_dir) / Path(doc).relative_to(in_dir).with_suffix(".json")
+
+
+# -----------------------------
+# Extraction
+# -----------------------------
+
+def is_retryable(exc):
+    if isinstance(exc, (InvalidNetwork, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+async def extract_one(client, bucket, text, model, retries):
+    """Extract one narrative, retrying transient failures up to ``retries`` times."""
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(retries + 1),
+        wait=wait_random_exponential(multiplier=0.5, max=30),
+        retry=retry_if_exception(is_retryable),
+        reraise=True,
+    ):
+        with attempt:
+            await bucket.acquire()
+            resp = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": build_prompt(text)}],
+                temperature=TEMPERATURE,
+            )
+            return parse_response(resp.choices[0].message.content or "")
+
+
+async def run_job(in_dir, out_dir, pattern="*.md", concurrency=8, rate=5.0, burst=None,
+                  retries=6, model=MODEL, base_url=None, client=None):
+    """
+    Extract every ``pattern`` file under ``in_dir`` into ``out_dir``.
+
+    Documents already recorded as ``ok`` with an unchanged hash are skipped.
+    Returns a ``{"ok", "failed", "skipped"}`` count dict.
+    """
+    in_dir, out_dir = Path(in_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if client is None:
+        client = openai.AsyncOpenAI(base_url=base_url, max_retries=0)
+
+    checkpoint = load_checkpoint(out_dir)
+    docs = sorted(p for p in in_dir.rglob(pattern) if p.is_file())
+    todo = []
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    for doc in docs:
+        key = doc.relative_to(in_dir).as_posix()
+        digest = file_digest(doc)
+        record = checkpoint.get(key)
+        if (record and record["status"] == "ok" and record["sha256"] == digest
+                and output_path(in_dir, out_dir, doc).exists()):
+            counts["skipped"] += 1
+            continue
+        todo.append((doc, key, digest))
+
+    bucket = TokenBucket(rate, burst)
+    queue = asyncio.Queue()
+    for item in todo:
+        queue.put_nowait(item)
+
+    async def worker():
+        while True:
+            try:
+                doc, key, digest = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = {"file": key, "sha256": digest}
+            try:
+                text = doc.read_text(encoding="utf-8")
+                network = await extract_one(client, bucket, text, model, retries)
+                write_json_atomic(output_path(in_dir, out_dir, doc), network)
+                record["status"] = "ok"
+                counts["ok"] += 1
+            except Exception as e:
+                record.update(status="failed", error=f"{type(e).__name__}: {e}")
+                counts["failed"] += 1
+            append_checkpoint(out_dir, record)
+            print(f"[{record['status']}] {key}")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return counts
+
+
+# -----------------------------
+# Offline stub of the chat completions endpoint
+# -----------------------------
+
+def stub_network(text):
+    """Deterministic fake extraction: every sentence is evidence for the last one."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s.strip()]
+    if not sentences:
+        return {"evidence": [], "hypotheses": [], "connections": []}
+    *facts, claim = sentences
+    return {
+        "evidence": [{"id": f"E{i}", "text": s} for i, s in enumerate(facts, start=1)],
+        "hypotheses": [{"id": "H1", "text": claim, "likelihood": ""}],
+        "connections": [{"source": f"E{i}", "target": "H1"} for i in range(1, len(facts) + 1)],
+    }
+
+
+def make_stub_handler(fail_rate=0.0):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if random.random() < fail_rate:
+                self._send(random.choice([429, 500]), {"error": {"message": "injected failure"}})
+                return
+            prompt = body["messages"][-1]["content"]
+            text = prompt.split("Apply the rules to:", 1)[-1]
+            content = json.dumps(stub_network(text))
+            if body.get("stream"):
+                self._send_stream(body.get("model", MODEL), content)
+                return
+            self._send(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", MODEL),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+            })
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, model, content, piece=16):
+            # Server-sent events in the chat.completion.chunk format
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i in range(0, len(content), piece):
+                chunk = {
+                    "id": "stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": content[i:i + piece]},
+                        "finish_reason": None,
+                    }],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def _positive_float(value):
+    x = float(value)
+    if not x > 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return x
+
+
+def _non_negative_int(value):
+    n = int(value)
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"must be non-negative, got {value}")
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk narrative → network extraction")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Extract every narrative in a directory")
+    run.add_argument("input_dir")
+    run.add_argument("output_dir")
+    run.add_argument("--glob", default="*.md")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--rate", type=_positive_float, default=5.0, help="requests per second")
+    run.add_argument("--burst", type=float, default=None, help="bucket capacity (at least 1)")
+    run.add_argument("--retries", type=_non_negative_int, default=6, help="retries after the first attempt")
+    run.add_argument("--model", default=MODEL)
+    run.add_argument("--base-url", default=None)
+
+    stub = sub.add_parser("stub", help="Serve a local fake chat completions endpoint")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8089)
+    stub.add_argument("--fail-rate", type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.command == "run" and args.burst is not None and args.burst < 1:
+        parser.error("--burst must be at least 1")
+    if args.command == "stub":
+        server = ThreadingHTTPServer((args.host, args.port), make_stub_handler(args.fail_rate))
+        print(f"Stub chat completions on http://{args.host}:{args.port}/v1")
+        server.serve_forever()
+        return
+
+    counts = asyncio.run(run_job(
+        args.input_dir, args.output_dir, args.glob, args.concurrency, args.rate,
+        args.burst, args.retries, args.model, args.base_url,
+    ))
+    print(f"Done: {counts['ok']} ok, {counts['failed']} failed, {counts['skipped']} skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Conditional queries such as P(H | E3 = True, E1 = False).
+
+The network is read as a Bayesian network: each evidence node is a root that
+is true with its truth-probability, and each hypothesis follows its compiled
+CPT (see ``cpt.py``). For a query, observed nodes are clamped and only the
+relevant part of the graph is touched, i.e. the targets, the observed nodes
+and their unobserved ancestors:
+
+1. Unobserved roots with a single relevant child are summed into that
+   child's table (repeatedly, so tree-shaped ancestry collapses entirely).
+2. The remaining unobserved ancestors (shared parents, and a target with
+   relevant descendants) are enumerated in one array of 2^u rows.
+3. The target's posterior is the weighted mean over the rows, normalised by
+   the probability of the observations.
+
+Each target is solved over its own ancestry, plus that of the observations
+connected to it. Unrelated observations are independent of it and skipped.
+Queries in a batch that observe the same nodes and ask for the same targets
+share one evaluation, with their observed values as an extra array axis.
+
+With no observations this gives the exact marginal under the network, which
+differs from Calc Prior: Calc Prior plugs expected truth-probabilities into
+the logistic rule instead of averaging over assignments.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from cpt import CPTCache
+from network_model import LABEL_TO_DECIMAL, truth_table_bits
+
+MAX_ENUMERATED = 20
+MAX_WEIGHT_CELLS = 1 << 24   # enumerated rows × grouped queries (128 MB of float64)
+
+
+class QueryError(ValueError):
+    """Raised for queries that name unknown nodes or are too large to enumerate."""
+
+
+def _sum_out(table, m, i, p):
+    """Marginalise parent bit ``i`` out of a 2^m table, given P(bit = 1) = ``p``."""
+    t = table.reshape((2,) * m)
+    axis = m - 1 - i          # C order puts the highest bit on axis 0
+    return (p * np.take(t, 1, axis=axis) + (1.0 - p) * np.take(t, 0, axis=axis)).ravel()
+
+
+class QueryEngine:
+    def __init__(self, g, priors, truth_probs, edge_strengths, cpts=None):
+        if cpts is None:
+            cpts = CPTCache()
+            cpts.sync(g, priors, edge_strengths)
+        self.groups = {n: g.nodes[n]["group"] for n in g.nodes}
+        self.factors = {}   # node → (parents, table of P(node = True | parent mask))
+        for n, group in self.groups.items():
+            if group == "evidence":
+                t = LABEL_TO_DECIMAL.get(truth_probs.get(n, ""), 0.0)
+                self.factors[n] = ((), np.array([t]))
+            else:
+                cpt = cpts.get(n)
+                self.factors[n] = (cpt.parents, cpt.table) if cpt is not None else None
+
+    def query(self, targets=None, evidence=None):
+        """Posterior ``{target: P(target = True | evidence)}`` for one query."""
+        return self.query_batch([{"targets": targets, "evidence": evidence}])[0]
+
+    def query_batch(self, queries):
+        """
+        Answer ``[{"targets": [...], "evidence": {node: bool}}, ...]`` in input
+        order. Missing or empty ``targets`` means every hypothesis.
+        """
+        groups = defaultdict(list)
+        for qi, q in enumerate(queries):
+            targets, evidence = self.validate(q)
+            groups[(tuple(sorted(evidence)), targets)].append((qi, evidence))
+
+        results = [None] * len(queries)
+        for (observed, targets), members in groups.items():
+            values = np.array([[ev[n] for n in observed] for _, ev in members], dtype=bool)
+            values = values.reshape(len(members), len(observed))
+            posts = self._solve(targets, observed, values)
+            for k, (qi, _) in enumerate(members):
+                results[qi] = {t: float(posts[t][k]) for t in targets}
+        return results
+
+    def validate(self, q):
+        """
+        Check one query and return it as ``(targets, {node: bool})``; raises
+        QueryError for anything malformed, so callers can reject it up front.
+        """
+        if not isinstance(q, dict):
+            raise QueryError("Each query must be an object with 'targets' and 'evidence'")
+        targets = q.get("targets") or [n for n, grp in self.groups.items() if grp == "hypothesis"]
+        evidence = q.get("evidence") or {}
+        if not isinstance(targets, (list, tuple)) or not all(isinstance(n, str) for n in targets):
+            raise QueryError(f"'targets' must be a list of node IDs, got {targets!r}")
+        if not isinstance(evidence, dict):
+            raise QueryError(f"'evidence' must map node IDs to true/false, got {evidence!r}")
+        unknown = [n for n in list(targets) + list(evidence) if n not in self.groups]
+        if unknown:
+            raise QueryError(f"Unknown node(s): {', '.join(map(str, unknown))}")
+        for n, v in evidence.items():
+            if not isinstance(v, (bool, int, float)) or v not in (0, 1):
+                raise QueryError(f"Observed value for {n} must be true or false, got {v!r}")
+        return tuple(dict.fromkeys(targets)), {n: bool(v) for n, v in evidence.items()}
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+
+    def _ancestry(self, nodes):
+        """``nodes`` plus all their ancestors."""
+        out, stack = set(), list(nodes)
+        while stack:
+            n = stack.pop()
+            if n in out:
+                continue
+            out.add(n)
+            if self.factors[n] is None:
+                raise QueryError(f"{n} has too many parents to compile a CPT")
+            stack.extend(self.factors[n][0])
+        return out
+
+    def _solve(self, targets, observed, values):
+        return {t: self._solve_one(t, observed, values) for t in targets}
+
+    def _solve_one(self, target, observed, values):
+        """P(target = True | observations) for every row of ``values``."""
+        if target in observed:
+            return values[:, observed.index(target)].astype(float)
+
+        # Relevant nodes: the target's ancestry, plus the ancestry of every
+        # observation that connects to it (others are independent of it)
+        relevant = self._ancestry([target])
+        pending = {o: self._ancestry([o]) for o in observed}
+        changed = True
+        while changed:
+            changed = False
+            for o, anc in list(pending.items()):
+                if not anc.isdisjoint(relevant):
+                    relevant |= pending.pop(o)
+                    changed = True
+        used = [j for j, o in enumerate(observed) if o not in pending]
+        obs_col = {observed[j]: k for k, j in enumerate(used)}
+        values = values[:, used]
+
+        factors = {n: (list(self.factors[n][0]), self.factors[n][1]) for n in relevant}
+        children = defaultdict(list)
+        for n in relevant:
+            for p in factors[n][0]:
+                children[p].append(n)
+
+        # 1) Sum unobserved single-child roots into their child
+        def foldable(n):
+            return (n not in obs_col and n != target
+                    and not factors[n][0] and len(children[n]) == 1)
+
+        work = [n for n in relevant if foldable(n)]
+        while work:
+            n = work.pop()
+            if n not in factors or not foldable(n):
+                continue
+            (c,) = children.pop(n)
+            _, table = factors.pop(n)
+            c_parents, c_table = factors[c]
+            i = c_parents.index(n)
+            factors[c] = (c_parents[:i] + c_parents[i + 1:], _sum_out(c_table, len(c_parents), i, table[0]))
+            if foldable(c):
+                work.append(c)
+
+        # 2) Enumerate what is left; a target without relevant children is
+        #    averaged over the rows instead of enumerated
+        enumerated = [
+            n for n in factors
+            if n not in obs_col and not (n == target and not children[n])
+        ]
+        if len(enumerated) > MAX_ENUMERATED:
+            raise QueryError(
+                f"P({target} | …) needs {len(enumerated)} unobserved shared ancestors "
+                f"(limit {MAX_ENUMERATED}); observe some of them"
+            )
+        if len(values) << len(enumerated) > MAX_WEIGHT_CELLS:
+            raise QueryError(
+                f"P({target} | …) over {len(values)} queries × 2^{len(enumerated)} rows exceeds "
+                f"{MAX_WEIGHT_CELLS:,} cells; send fewer queries per request"
+            )
+        bits = truth_table_bits(len(enumerated))
+        enum_col = {n: j for j, n in enumerate(enumerated)}
+
+        def value(n):
+            # (rows, 1) for enumerated nodes, (1, queries) for observed ones
+            if n in enum_col:
+                return bits[:, enum_col[n]][:, None]
+            return values[:, obs_col[n]][None, :]
+
+        def prob_true(n):
+            parents, table = factors[n]
+            mask = np.zeros((1, 1), dtype=np.int64)
+            for i, p in enumerate(parents):
+                mask = mask | (value(p).astype(np.int64) << i)
+            return table[mask]
+
+        weight = np.ones((len(bits), len(values)))
+        for n, (parents, _) in factors.items():
+            if n in obs_col and not parents:
+                continue   # constant per query; cancels when normalising
+            if n in enum_col or n in obs_col:
+                p = prob_true(n)
+                weight = weight * np.where(value(n), p, 1.0 - p)
+
+        # 3) Normalise by P(observations); impossible observations give NaN
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if target in enum_col:
+                return (weight * value(target)).sum(axis=0) / weight.sum(axis=0)
+            return (weight * prob_true(target)).sum(axis=0) / weight.sum(axis=0)
@@ -0,0 +1,139 @@
+"""
+Compiled conditional probability tables (CPTs) for hypotheses.
+
+Under the logistic rule, P(H = True | parents) = σ(β₀ + Σᵢ βᵢ·Xᵢ) depends
+only on which parents are true. A hypothesis with m ≤ ``MAX_CPT_PARENTS``
+parents is therefore compiled once into a dense array of 2^m
+probabilities. Bit i of the index says whether ``parents[i]`` is true, so
+any later query is a single array lookup (or one fancy-indexing gather for
+a batch).
+
+:class:`CPTCache` keeps the tables between Builder reruns. Each table is
+keyed by its hypothesis's prior label and the ``(parent, strength)`` pairs
+of its incoming edges, and only recompiles when that key changes. Edits
+elsewhere in the network leave it alone.
+
+The semantics match the truth tables: every direct parent counts (evidence
+or hypothesis), a missing prior means 0.5 and a missing strength means
+βᵢ = 0.
+"""
+import numpy as np
+
+from network_model import LABEL_TO_DECIMAL, edge_beta, logit
+
+MAX_CPT_PARENTS = 16     # 65,536 entries per table
+
+
+class CompiledCPT:
+    __slots__ = ("hypothesis", "parents", "beta0", "betas", "table")
+
+    def __init__(self, hypothesis, parents, beta0, betas):
+        self.hypothesis = hypothesis
+        self.parents = tuple(parents)
+        self.beta0 = float(beta0)
+        self.betas = np.asarray(betas, dtype=float)
+        # Doubling: after step i, z covers every mask over the first i+1 parents
+        z = np.array([self.beta0])
+        for b in self.betas:
+            z = np.concatenate([z, z + b])
+        self.table = 1.0 / (1.0 + np.exp(-z))
+
+    def __len__(self):
+        return len(self.table)
+
+    def mask(self, assignment):
+        """Bitmask for ``{parent: bool}``; parents not mentioned count as False."""
+        m = 0
+        for i, p in enumerate(self.parents):
+            if assignment.get(p):
+                m |= 1 << i
+        return m
+
+    def prob(self, assignment):
+        """P(H = True) for one parent assignment."""
+        return float(self.table[self.mask(assignment)])
+
+    def masks_from_bits(self, bits, columns):
+        """
+        Row masks for a boolean matrix whose columns are the nodes in
+        ``columns``. Columns that are not parents are ignored and parents
+        missing from ``columns`` count as False.
+        """
+        col = {n: j for j, n in enumerate(columns)}
+        masks = np.zeros(len(bits), dtype=np.int64)
+        for i, p in enumerate(self.parents):
+            if p in col:
+                masks |= bits[:, col[p]].astype(np.int64) << i
+        return masks
+
+    def lookup(self, bits, columns):
+        """P(H = True) for every row of ``bits`` in one gather."""
+        return self.table[self.masks_from_bits(bits, columns)]
+
+    def to_json(self):
+        return {
+            "parents": list(self.parents),
+            "beta0": self.beta0,
+            "betas": self.betas.tolist(),
+            "table": self.table.tolist(),
+        }
+
+
+def cpt_key(g, h, priors, edge_strengths):
+    """Everything a table depends on: the prior label and each incoming ``(parent, strength)``."""
+    parents = tuple(g.predecessors(h))
+    return (priors.get(h), tuple((p, edge_strengths.get((p, h))) for p in parents))
+
+
+def compile_cpt(g, h, priors, edge_strengths):
+    """Compile the table of hypothesis ``h``; None if it has too many parents."""
+    parents = list(g.predecessors(h))
+    if len(parents) > MAX_CPT_PARENTS:
+        return None
+    beta0 = logit(LABEL_TO_DECIMAL.get(priors.get(h, ""), 0.5))
+    betas = [edge_beta(edge_strengths.get((p, h), 1.0)) for p in parents]
+    return CompiledCPT(h, parents, beta0, betas)
+
+
+class CPTCache:
+    """Per-hypothesis compiled tables, recompiled only when their inputs change."""
+
+    def __init__(self):
+        self.tables = {}        # hypothesis → CompiledCPT, or None when too wide
+        self.keys = {}          # hypothesis → key the table was compiled from
+        self.compiled = 0       # total compilations, for inspection
+        self.last_compiled = []
+
+    def sync(self, g, priors, edge_strengths):
+        """
+        Bring the cache in line with the network and return the hypotheses
+        that were (re)compiled.
+        """
+        live = set()
+        recompiled = []
+        for h in g.nodes:
+            if g.nodes[h]["group"] != "hypothesis":
+                continue
+            live.add(h)
+            key = cpt_key(g, h, priors, edge_strengths)
+            if h in self.keys and self.keys[h] == key:
+                continue
+            self.tables[h] = compile_cpt(g, h, priors, edge_strengths)
+            self.keys[h] = key
+            recompiled.append(h)
+        for h in [h for h in self.keys if h not in live]:
+            del self.tables[h]
+            del self.keys[h]
+        self.compiled += len(recompiled)
+        self.last_compiled = recompiled
+        return recompiled
+
+    def get(self, h):
+        return self.tables.get(h)
+
+    def __contains__(self, h):
+        return self.tables.get(h) is not None
+
+    def export(self):
+        """JSON-ready ``{hypothesis: {"parents", "beta0", "betas", "table"}}``."""
+        return {h: cpt.to_json() for h, cpt in self.tables.items() if cpt is not None}
@@ -0,0 +1,348 @@
+"""
+Versioned edit history for a network and its parameters.
+
+Each version holds six persistent maps (evidence, hypotheses, connections,
+priors, truth_probs, edge_strengths). The maps are hash tries with 32-way
+branching and path copying. An edit copies only the O(log₃₂ n) nodes on the
+path to the changed key and shares everything else with the previous
+version, so keeping a long history costs memory proportional to the edits,
+not to the network size. Undo/redo move a cursor (O(1)). ``diff`` skips
+subtrees that two versions share by identity, so it costs roughly the size
+of the change. Its output can drive incremental recomputation.
+"""
+from collections import namedtuple
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+HASH_MASK = (1 << 64) - 1
+_EMPTY_NODE = (None,) * WIDTH
+
+
+# -----------------------------
+# Persistent hash trie
+# -----------------------------
+
+class _Leaf:
+    """All entries whose full hash is ``hash`` (usually exactly one)."""
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, h, pairs):
+        self.hash = h
+        self.pairs = pairs
+
+
+def _hash(key):
+    return hash(key) & HASH_MASK
+
+
+def _assoc(node, shift, h, key, value):
+    """Return ``(new_node, added)``; ``new_node is node`` when nothing changed."""
+    idx = (h >> shift) & MASK
+    slot = node[idx]
+    added = False
+    if slot is None:
+        new = _Leaf(h, ((key, value),))
+        added = True
+    elif isinstance(slot, _Leaf):
+        if slot.hash == h:
+            for i, (k, v) in enumerate(slot.pairs):
+                if k == key:
+                    if v is value or v == value:
+                        return node, False
+                    new = _Leaf(h, slot.pairs[:i] + ((key, value),) + slot.pairs[i + 1:])
+                    break
+            else:
+                new = _Leaf(h, slot.pairs + ((key, value),))
+                added = True
+        else:
+            # Push the existing leaf one level down, then insert beside it
+            child = list(_EMPTY_NODE)
+            child[(slot.hash >> (shift + BITS)) & MASK] = slot
+            new, added = _assoc(tuple(child), shift + BITS, h, key, value)
+    else:
+        new, added = _assoc(slot, shift + BITS, h, key, value)
+        if new is slot:
+            return node, False
+    return node[:idx] + (new,) + node[idx + 1:], added
+
+
+def _dissoc(node, shift, h, key):
+    """Return ``(new_node_or_None, removed)``."""
+    idx = (h >> shift) & MASK
+    slot = node[idx]
+    if slot is None:
+        return node, False
+    if isinstance(slot, _Leaf):
+        if slot.hash != h:
+            return node, False
+        pairs = tuple(p for p in slot.pairs if p[0] != key)
+        if len(pairs) == len(slot.pairs):
+            return node, False
+        new = _Leaf(h, pairs) if pairs else None
+    else:
+        new, removed = _dissoc(slot, shift + BITS, h, key)
+        if not removed:
+            return node, False
+    node = node[:idx] + (new,) + node[idx + 1:]
+    return (None if node == _EMPTY_NODE else node), True
+
+
+def _items(slot):
+    if slot is None:
+        return
+    if isinstance(slot, _Leaf):
+        yield from slot.pairs
+        return
+    for child in slot:
+        yield from _items(child)
+
+
+def _diff(a, b, added, removed, changed):
+    if a is b:
+        return
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        for x, y in zip(a, b):
+            _diff(x, y, added, removed, changed)
+        return
+    old, new = dict(_items(a)), dict(_items(b))
+    for k, v in new.items():
+        if k not in old:
+            added[k] = v
+        elif old[k] is not v and old[k] != v:
+            changed[k] = (old[k], v)
+    for k, v in old.items():
+        if k not in new:
+            removed[k] = v
+
+
+class PMap:
+    """Immutable mapping; ``set``/``delete`` return a new map sharing structure."""
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, root=None, size=0):
+        self._root = root
+        self._size = size
+
+    @classmethod
+    def from_items(cls, items):
+        m = cls()
+        for k, v in items:
+            m = m.set(k, v)
+        return m
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return (k for k, _ in _items(self._root))
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        h, node, shift = _hash(key), self._root, 0
+        while node is not None:
+            slot = node[(h >> shift) & MASK]
+            if isinstance(slot, _Leaf):
+                if slot.hash == h:
+                    for k, v in slot.pairs:
+                        if k == key:
+                            return v
+                return default
+            node, shift = slot, shift + BITS
+        return default
+
+    def items(self):
+        return _items(self._root)
+
+    def set(self, key, value):
+        root, added = _assoc(self._root or _EMPTY_NODE, 0, _hash(key), key, value)
+        if root is self._root:
+            return self
+        return PMap(root, self._size + added)
+
+    def delete(self, key):
+        if self._root is None:
+            return self
+        root, removed = _dissoc(self._root, 0, _hash(key), key)
+        return PMap(root, self._size - 1) if removed else self
+
+    def diff(self, other):
+        """Changes from ``self`` to ``other`` as ``{"added", "removed", "changed"}`` dicts."""
+        added, removed, changed = {}, {}, {}
+        _diff(self._root, other._root, added, removed, changed)
+        return {"added": added, "removed": removed, "changed": changed}
+
+
+_MISSING = object()
+
+
+# -----------------------------
+# Network versions
+# -----------------------------
+
+PARTS = ("evidence", "hypotheses", "connections", "priors", "truth_probs", "edge_strengths")
+_ORDERED = ("evidence", "hypotheses", "connections")
+
+
+def _list_key(part, item):
+    return (item["source"], item["target"]) if part == "connections" else item["id"]
+
+
+class NetworkVersion(namedtuple("NetworkVersion", PARTS + ("next_seq",))):
+    """
+    One immutable snapshot. List parts map key → ``(seq, item)`` so the
+    original ordering can be restored; parameter parts map key → value.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def empty(cls):
+        return cls(*(PMap() for _ in PARTS), 0)
+
+    def sync(self, network_data, priors, truth_probs, edge_strengths):
+        """
+        Return the version matching the given plain state, reusing every
+        unchanged entry (and ``self`` itself when nothing changed).
+        """
+        parts = self._asdict()
+        seq = self.next_seq
+        for part in _ORDERED:
+            old = parts[part]
+            new = old
+            seen = set()
+            for item in network_data.get(part, []):
+                key = _list_key(part, item)
+                seen.add(key)
+                current = old.get(key)
+                if current is None:
+                    new = new.set(key, (seq, dict(item)))
+                    seq += 1
+                elif current[1] != item:
+                    new = new.set(key, (current[0], dict(item)))
+            if len(seen) != len(new):
+                for key in [k for k in new if k not in seen]:
+                    new = new.delete(key)
+            parts[part] = new
+        for part, plain in (("priors", priors), ("truth_probs", truth_probs), ("edge_strengths", edge_strengths)):
+            old = parts[part]
+            new = old
+            for key, value in plain.items():
+                new = new.set(key, value)
+            if len(new) != len(plain):
+                for key in [k for k in new if k not in plain]:
+                    new = new.delete(key)
+            parts[part] = new
+        parts["next_seq"] = seq
+        if all(parts[p] is getattr(self, p) for p in PARTS):
+            return self
+        return NetworkVersion(**parts)
+
+    def to_state(self):
+        """Materialise ``(network_data, priors, truth_probs, edge_strengths)``."""
+        network_data = {
+            part: [dict(item) for _, item in sorted((v for _, v in getattr(self, part).items()), key=lambda p: p[0])]
+            for part in _ORDERED
+        }
+        return (
+            network_data,
+            dict(self.priors.items()),
+            dict(self.truth_probs.items()),
+            dict(self.edge_strengths.items()),
+        )
+
+    def diff(self, other):
+        """Per-part diffs from ``self`` to ``other``; list parts report items, not ``(seq, item)``."""
+        out = {}
+        for part in PARTS:
+            d = getattr(self, part).diff(getattr(other, part))
+            if part in _ORDERED:
+                d = {
+                    "added":   {k: v[1] for k, v in d["added"].items()},
+                    "removed": {k: v[1] for k, v in d["removed"].items()},
+                    "changed": {k: (a[1], b[1]) for k, (a, b) in d["changed"].items() if a[1] != b[1]},
+                }
+            if any(d.values()):
+                out[part] = d
+        return out
+
+
+def summarise_diff(diff):
+    """Short human summary such as ``+1 evidence, ~2 priors``."""
+    bits = []
+    for part, d in diff.items():
+        for sign, kind in (("+", "added"), ("−", "removed"), ("~", "changed")):
+            if d[kind]:
+                bits.append(f"{sign}{len(d[kind])} {part}")
+    return ", ".join(bits) or "no changes"
+
+
+# -----------------------------
+# History
+# -----------------------------
+
+class EditHistory:
+    """Bounded linear undo/redo stack of :class:`NetworkVersion` snapshots."""
+
+    def __init__(self, initial=None, max_versions=200):
+        self.max_versions = max_versions
+        self._versions = [initial or NetworkVersion.empty()]
+        self._labels = ["Start"]
+        self._cursor = 0
+
+    @classmethod
+    def from_state(cls, network_data, priors, truth_probs, edge_strengths, max_versions=200):
+        initial = NetworkVersion.empty().sync(network_data, priors, truth_probs, edge_strengths)
+        return cls(initial, max_versions)
+
+    @property
+    def current(self):
+        return self._versions[self._cursor]
+
+    @property
+    def label(self):
+        return self._labels[self._cursor]
+
+    @property
+    def position(self):
+        return self._cursor + 1, len(self._versions)
+
+    def can_undo(self):
+        return self._cursor > 0
+
+    def can_redo(self):
+        return self._cursor < len(self._versions) - 1
+
+    def commit(self, label, network_data, priors, truth_probs, edge_strengths):
+        """Record the plain state as a new version; returns False if nothing changed."""
+        new = self.current.sync(network_data, priors, truth_probs, edge_strengths)
+        if new is self.current:
+            return False
+        del self._versions[self._cursor + 1:]
+        del self._labels[self._cursor + 1:]
+        self._versions.append(new)
+        self._labels.append(label)
+        if len(self._versions) > self.max_versions:
+            del self._versions[0]
+            del self._labels[0]
+        self._cursor = len(self._versions) - 1
+        return True
+
+    def undo(self):
+        if self.can_undo():
+            self._cursor -= 1
+        return self.current
+
+    def redo(self):
+        if self.can_redo():
+            self._cursor += 1
+        return self.current
+
+    def diff(self, i=None, j=None):
+        """Diff between version indices ``i`` and ``j`` (default: previous → current)."""
+        if j is None:
+            j = self._cursor
+        if i is None:
+            i = max(j - 1, 0)
+        return self._versions[i].diff(self._versions[j])
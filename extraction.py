@@ -0,0 +1,303 @@
+"""
+Narrative → network JSON extraction helpers.
+
+Holds the GPT prompt used by the Builder and the validation applied to every
+model response, so the interactive path (``ui.py``) and the bulk job
+(``batch_extract.py``) produce the same network schema.
+"""
+import json
+import textwrap
+
+from network_model import SCALE
+
+MODEL = "gpt-4o-mini"
+TEMPERATURE = 0.2
+
+PROMPT_TEMPLATE = textwrap.dedent("""
+You will receive an analytic text.
+Task: extract **evidence** items and **hypotheses** items, then return
+ONE JSON object with exactly three arrays:
+
+{
+  "evidence":   [ {"id": "E1", "text": "..."} ],
+  "hypotheses": [ {"id": "H1", "text": "...", "likelihood": "Likely or Probable"} ],
+  "connections": [ {"source": "E1", "target": "H1"},
+                   {"source": "H1", "target": "H2"} ]
+}
+
+Rules:
+• Evidence IDs start with "E"; hypothesis IDs start with "H".
+• A connection links an evidence to a hypothesis OR a hypothesis to another hypothesis.
+• Include a "likelihood" field only if the source text states one value must be one of:
+    Remote Chance, Highly Unlikely, Unlikely, Realistic Possibility,
+    Likely or Probable, Highly Likely, Almost Certain.
+
+Return **nothing** except this JSON.
+
+Apply the rules to:
+{payload}
+""")
+
+
+def build_prompt(text):
+    # str.format would trip over the JSON braces in the template
+    return PROMPT_TEMPLATE.replace("{payload}", text)
+
+
+class InvalidNetwork(ValueError):
+    """The model response is not a usable network JSON object."""
+
+
+def strip_code_fences(raw):
+    """Remove a surrounding ```json … ``` block if the model added one."""
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[1] if "\n" in raw else ""
+    raw = raw.rstrip()
+    if raw.endswith("```"):
+        raw = raw[:-3]
+    return raw.strip()
+
+
+def validate_network(parsed):
+    """
+    Check a parsed response against the network schema and return a cleaned
+    copy with exactly ``evidence``, ``hypotheses`` and ``connections``.
+
+    Raises InvalidNetwork describing the first problem found.
+    """
+    if not isinstance(parsed, dict):
+        raise InvalidNetwork("Top-level JSON value must be an object")
+
+    seen = set()
+    evidence, hypotheses = [], []
+    for key, prefix, out in (("evidence", "E", evidence), ("hypotheses", "H", hypotheses)):
+        items = parsed.get(key, [])
+        if not isinstance(items, list):
+            raise InvalidNetwork(f"'{key}' must be an array")
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+                raise InvalidNetwork(f"Every '{key}' item needs a string 'id'")
+            node_id = item["id"]
+            if not node_id.startswith(prefix):
+                raise InvalidNetwork(f"{key} ID '{node_id}' must start with '{prefix}'")
+            if node_id in seen:
+                raise InvalidNetwork(f"Duplicate node ID '{node_id}'")
+            if not isinstance(item.get("text", ""), str):
+                raise InvalidNetwork(f"'{node_id}' text must be a string")
+            seen.add(node_id)
+            entry = {"id": node_id, "text": item.get("text", "")}
+            if prefix == "H":
+                likelihood = item.get("likelihood", "") or ""
+                if likelihood and likelihood not in SCALE:
+                    raise InvalidNetwork(f"'{node_id}' likelihood '{likelihood}' is not on the scale")
+                entry["likelihood"] = likelihood
+            out.append(entry)
+
+    hyp_ids = {hy["id"] for hy in hypotheses}
+    connections = []
+    conns = parsed.get("connections", [])
+    if not isinstance(conns, list):
+        raise InvalidNetwork("'connections' must be an array")
+    for conn in conns:
+        if not isinstance(conn, dict):
+            raise InvalidNetwork("Every connection must be an object")
+        src, dst = conn.get("source"), conn.get("target")
+        if src not in seen or dst not in seen:
+            raise InvalidNetwork(f"Connection {src} → {dst} references an unknown node")
+        if dst not in hyp_ids:
+            raise InvalidNetwork(f"Connection {src} → {dst} must target a hypothesis")
+        pair = {"source": src, "target": dst}
+        if pair not in connections:
+            connections.append(pair)
+
+    return {"evidence": evidence, "hypotheses": hypotheses, "connections": connections}
+
+
+def parse_response(raw):
+    """``json.loads`` + :func:`validate_network`, raising InvalidNetwork on failure."""
+    try:
+        parsed = json.loads(strip_code_fences(raw))
+    except json.JSONDecodeError as e:
+        raise InvalidNetwork(f"Response is not valid JSON: {e}")
+    return validate_network(parsed)
+
+
+# -----------------------------
+# Streaming / incremental parsing
+# -----------------------------
+
+NETWORK_KEYS = ("evidence", "hypotheses", "connections")
+
+
+class IncrementalNetworkParser:
+    """
+    Feed streamed completion text in arbitrary chunks; get back every array
+    element of the top-level object as soon as its closing brace arrives.
+
+    Only the outer shape ``{"key": [ {...}, ... ], ...}`` is tracked
+    character-by-character, which is enough to reject a malformed response
+    at the first offending character instead of after the full generation.
+
+    Chunks are kept in a list and joined only when ``text`` is read. The
+    scanner works on a small buffer holding just the unfinished string or
+    item, so feeding a long stream stays linear.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._text = None         # cached "".join(self._chunks)
+        self._buf = ""            # text from absolute offset self._base on
+        self._base = 0
+        self._pos = 0             # absolute offset of the next character
+        self._stack = []          # open '{' / '[' characters
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._key = None          # most recent key string at depth 1
+        self._item_start = None   # offset of the current element's '{'
+        self._started = False
+        self._finished = False
+        self._fence = False       # inside a leading ```json line
+
+    @property
+    def text(self):
+        """Everything fed so far."""
+        if self._text is None:
+            self._text = "".join(self._chunks)
+        return self._text
+
+    def _slice(self, start, stop):
+        return self._buf[start - self._base:stop - self._base]
+
+    def _fail(self, message):
+        snippet = self._slice(max(self._base, self._pos - 20), self._pos + 1)
+        raise InvalidNetwork(f"{message} at offset {self._pos}: …{snippet!r}")
+
+    def feed(self, chunk):
+        """Consume ``chunk`` and return the list of ``(key, element)`` now complete."""
+        self._chunks.append(chunk)
+        self._text = None
+        self._buf += chunk
+        end = self._base + len(self._buf)
+        events = []
+        while self._pos < end:
+            ch = self._buf[self._pos - self._base]
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if depth == 1:
+                        self._key = json.loads(self._slice(self._string_start, self._pos + 1))
+            elif self._fence:
+                if ch == "\n":
+                    self._fence = False
+            elif ch in " \t\r\n":
+                pass
+            elif self._finished:
+                if ch != "`":
+                    self._fail("Unexpected text after the JSON object")
+            elif not self._started:
+                if ch == "`":
+                    self._fence = True
+                elif ch == "{":
+                    self._started = True
+                    self._stack.append(ch)
+                else:
+                    self._fail("Response does not start with a JSON object")
+            elif ch == '"' and depth != 2:
+                self._in_string = True
+                self._string_start = self._pos
+            elif depth == 1:
+                if ch == "[":
+                    self._stack.append(ch)
+                elif ch == "}":
+                    self._stack.pop()
+                    self._finished = True
+                elif ch not in ":,":
+                    self._fail("Top-level values must be arrays")
+            elif depth == 2:
+                if ch == "{":
+                    self._item_start = self._pos
+                    self._stack.append(ch)
+                elif ch == "]":
+                    self._stack.pop()
+                elif ch != ",":
+                    self._fail("Array items must be objects")
+            elif ch in "{[":
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack[-1] != {"}": "{", "]": "["}[ch]:
+                    self._fail("Mismatched bracket")
+                self._stack.pop()
+                if len(self._stack) == 2 and ch == "}":
+                    raw = self._slice(self._item_start, self._pos + 1)
+                    try:
+                        item = json.loads(raw)
+                    except json.JSONDecodeError as e:
+                        self._fail(f"Malformed {self._key} item ({e.msg})")
+                    events.append((self._key, item))
+            self._pos += 1
+
+        # Drop scanned text, keeping an open string or item and a little
+        # context for error messages
+        keep = self._pos - 20
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if len(self._stack) > 2:
+            keep = min(keep, self._item_start)
+        if keep > self._base:
+            self._buf = self._buf[keep - self._base:]
+            self._base = keep
+        return events
+
+    def close(self):
+        """Validate the complete response and return the cleaned network."""
+        if not self._finished:
+            raise InvalidNetwork("Response ended before the JSON object was closed")
+        return parse_response(self.text)
+
+
+def stream_extract(client, text, model=MODEL):
+    """
+    Stream a chat completion for ``text`` and yield ``(key, element)`` for each
+    evidence/hypothesis/connection as it completes, then ``("raw", text)``
+    and a final ``("network", validated_network)``. Raises InvalidNetwork
+    early on a malformed response, with the text received so far as ``raw``.
+    """
+    parser = IncrementalNetworkParser()
+    try:
+        yield from _stream_items(client, text, model, parser)
+    except InvalidNetwork as e:
+        e.raw = parser.text   # so callers can show what was received
+        raise
+    yield "raw", parser.text
+    try:
+        network = parser.close()
+    except InvalidNetwork as e:
+        e.raw = parser.text
+        raise
+    yield "network", network
+
+
+def _stream_items(client, text, model, parser):
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": build_prompt(text)}],
+        temperature=TEMPERATURE,
+        stream=True,
+    )
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield from ((k, item) for k, item in parser.feed(delta) if k in NETWORK_KEYS)
+    finally:
+        stream.close()
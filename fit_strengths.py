@@ -0,0 +1,308 @@
+"""
+Fit edge strengths from resolved hypotheses.
+
+Each archived network may carry an ``outcomes`` map of resolved hypotheses
+(``{"H1": true, "H2": false}``). Every resolved hypothesis contributes one
+observation to a single pooled logistic regression over all of its direct
+parents, as in the truth tables and compiled CPTs (Calc Prior only reads
+evidence parents):
+
+    z_h = logit(prior_h) + θ₀ + c_L(h) + Σᵢ (μ + v_k(i))·xᵢ
+
+xᵢ is the parent's truth-probability for evidence, or the parent's outcome
+(its prior if unresolved) for hypotheses. θ₀ (global prior bias) and μ (mean
+log-strength) are shared by every network. Deviations are pooled over keys
+shared across networks, never per hypothesis or per edge, since a single
+outcome would otherwise be memorised by its own parameter: c_L is one
+deviation per prior label L, and v_k one per hand-entered strength k (so the
+fit learns what an analyst's "2.0" is really worth). Both are
+L2-regularised, so thin data shrinks towards the pooled values. Fitted
+β₀ = logit(prior) + θ₀ + c_L and βᵢ = ln rᵢ = μ + v_k.
+
+Each edge of a fitted network whose entered strength was seen in the fit is
+written back as e^(μ + v_k), and each prior label's β₀ is written back to
+``priors`` as the nearest ``SCALE`` label. Hypotheses without a prior keep
+none.
+
+All observations are solved at once with L-BFGS. Gradients are segment sums
+(``np.bincount``) over flat arrays, so there is no per-hypothesis loop.
+
+Usage:
+    python fit_strengths.py archive/*.json --out-dir fitted/ --l2 1.0
+"""
+import argparse
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from network_model import (
+    LABEL_TO_DECIMAL,
+    SCALE,
+    build_graph_from_json,
+    dump_edge_strengths,
+    load_parameters,
+    logit,
+)
+
+DEFAULT_STRENGTH = 2.0   # the Builder's default odds multiplier
+
+
+# -----------------------------
+# Design arrays
+# -----------------------------
+
+def entered_strength(edge_strengths, u, v):
+    """The hand-entered multiplier of edge ``u → v``, the key its fitted strength is pooled under."""
+    r = edge_strengths.get((u, v))
+    return round(float(r), 4) if isinstance(r, (int, float)) else DEFAULT_STRENGTH
+
+
+def build_design(networks):
+    """
+    Flatten every resolved hypothesis of every network into arrays.
+
+    Returns a dict with ``offset``, ``y``, ``label_idx`` (one per hypothesis),
+    ``seg``, ``x``, ``strength_idx`` (one per incoming edge), the prior
+    ``labels`` (``""`` for none), the entered ``strengths``, and the
+    ``hyp_refs`` / ``edge_refs`` lists of ``(network_index, id)`` /
+    ``(network_index, u, v)``.
+    """
+    offset, y, label_idx, hyp_refs = [], [], [], []
+    labels, strengths = {}, {}
+    seg, x, strength_idx, edge_refs = [], [], [], []
+    for net_idx, net in enumerate(networks):
+        outcomes = {h: bool(v) for h, v in (net.get("outcomes") or {}).items() if v is not None}
+        if not outcomes:
+            continue
+        g = build_graph_from_json(net)
+        priors, truth_probs, edge_strengths = load_parameters(net)
+        for h, outcome in outcomes.items():
+            if h not in g.nodes or g.nodes[h]["group"] != "hypothesis":
+                continue
+            row = len(y)
+            hyp_refs.append((net_idx, h))
+            label = priors.get(h) if priors.get(h) in LABEL_TO_DECIMAL else ""
+            label_idx.append(labels.setdefault(label, len(labels)))
+            offset.append(logit(LABEL_TO_DECIMAL.get(label, 0.5)))
+            y.append(1.0 if outcome else 0.0)
+            for parent in g.predecessors(h):
+                if g.nodes[parent]["group"] == "evidence":
+                    xi = LABEL_TO_DECIMAL.get(truth_probs.get(parent, ""), 0.0)
+                elif parent in outcomes:
+                    xi = 1.0 if outcomes[parent] else 0.0
+                else:
+                    xi = LABEL_TO_DECIMAL.get(priors.get(parent, ""), 0.5)
+                seg.append(row)
+                x.append(xi)
+                strength_idx.append(strengths.setdefault(entered_strength(edge_strengths, parent, h), len(strengths)))
+                edge_refs.append((net_idx, parent, h))
+    return {
+        "offset": np.asarray(offset, dtype=float),
+        "y": np.asarray(y, dtype=float),
+        "label_idx": np.asarray(label_idx, dtype=np.intp),
+        "labels": list(labels),
+        "seg": np.asarray(seg, dtype=np.intp),
+        "x": np.asarray(x, dtype=float),
+        "strength_idx": np.asarray(strength_idx, dtype=np.intp),
+        "strengths": list(strengths),
+        "hyp_refs": hyp_refs,
+        "edge_refs": edge_refs,
+    }
+
+
+def log_loss(z, y):
+    """Mean negative log-likelihood of outcomes ``y`` under logits ``z``."""
+    return float(np.mean(np.logaddexp(0.0, z) - y * z)) if len(y) else float("nan")
+
+
+# -----------------------------
+# Solver
+# -----------------------------
+
+def lbfgs(fun, x0, max_iter=500, history=10, tol=1e-6):
+    """Minimise ``fun(x) -> (f, grad)`` with L-BFGS and Armijo backtracking."""
+    x = x0.copy()
+    f, g = fun(x)
+    s_hist, y_hist = [], []
+    it = 0
+    for it in range(1, max_iter + 1):
+        if np.max(np.abs(g), initial=0.0) < tol:
+            break
+        # Two-loop recursion for the quasi-Newton direction
+        q = g.copy()
+        saved = []
+        for s, yv in zip(reversed(s_hist), reversed(y_hist)):
+            rho = 1.0 / yv.dot(s)
+            a = rho * s.dot(q)
+            q -= a * yv
+            saved.append((rho, a, s, yv))
+        gamma = s_hist[-1].dot(y_hist[-1]) / y_hist[-1].dot(y_hist[-1]) if s_hist else 1.0 / max(1.0, np.abs(g).max())
+        r = gamma * q
+        for rho, a, s, yv in reversed(saved):
+            r += s * (a - rho * yv.dot(r))
+        d = -r
+        gd = g.dot(d)
+        if gd >= 0:
+            d, gd = -g, -g.dot(g)
+            s_hist.clear()
+            y_hist.clear()
+
+        step = 1.0
+        while True:
+            x_new = x + step * d
+            f_new, g_new = fun(x_new)
+            if f_new <= f + 1e-4 * step * gd or step < 1e-12:
+                break
+            step *= 0.5
+
+        s, yv = x_new - x, g_new - g
+        if s.dot(yv) > 1e-12:
+            s_hist.append(s)
+            y_hist.append(yv)
+            if len(s_hist) > history:
+                s_hist.pop(0)
+                y_hist.pop(0)
+        converged = abs(f - f_new) <= tol * max(1.0, abs(f))
+        x, f, g = x_new, f_new, g_new
+        if converged:
+            break
+    return x, it
+
+
+def fit(design, l2=1.0, max_iter=500):
+    """
+    Fit the pooled model. Returns a dict with ``theta0``, ``mu``, per-label
+    ``label_beta0``, per-entered-strength ``strength_beta``, per-hypothesis
+    ``beta0``, per-edge ``beta``, ``iterations`` and before/after
+    ``log_loss``.
+    """
+    off, y, lab = design["offset"], design["y"], design["label_idx"]
+    seg, x, key = design["seg"], design["x"], design["strength_idx"]
+    n_h, n_l, n_k = len(y), len(design["labels"]), len(design["strengths"])
+    if n_h == 0:
+        raise ValueError("No resolved hypotheses to fit (add an 'outcomes' map to the networks)")
+    sum_x = np.bincount(seg, weights=x, minlength=n_h)
+    eps = 1e-6   # keeps the shared parameters well-posed
+
+    def unpack(w):
+        return w[0], w[1], w[2:2 + n_l], w[2 + n_l:]
+
+    def logits(w):
+        theta0, mu, c, v = unpack(w)
+        return off + theta0 + c[lab] + mu * sum_x + np.bincount(seg, weights=v[key] * x, minlength=n_h)
+
+    def objective(w):
+        theta0, mu, c, v = unpack(w)
+        z = logits(w)
+        resid = 1.0 / (1.0 + np.exp(-z)) - y
+        f = (np.sum(np.logaddexp(0.0, z) - y * z)
+             + 0.5 * l2 * (c.dot(c) + v.dot(v))
+             + 0.5 * eps * (theta0 ** 2 + mu ** 2))
+        grad = np.empty_like(w)
+        grad[0] = resid.sum() + eps * theta0
+        grad[1] = resid.dot(sum_x) + eps * mu
+        grad[2:2 + n_l] = np.bincount(lab, weights=resid, minlength=n_l) + l2 * c
+        grad[2 + n_l:] = np.bincount(key, weights=resid[seg] * x, minlength=n_k) + l2 * v
+        return f, grad
+
+    # Start from the hand-entered parameters: μ = their mean log-strength
+    w0 = np.zeros(2 + n_l + n_k)
+    if len(x):
+        log_r = np.log([r if r > 0 else 1.0 for r in design["strengths"]])
+        w0[1] = log_r[key].mean()
+        w0[2 + n_l:] = log_r - w0[1]
+    before = log_loss(logits(w0), y)
+    w, iterations = lbfgs(objective, w0, max_iter=max_iter)
+    theta0, mu, c, v = unpack(w)
+    label_beta0 = {
+        label: float(logit(LABEL_TO_DECIMAL.get(label, 0.5)) + theta0 + c[i])
+        for i, label in enumerate(design["labels"])
+    }
+    return {
+        "theta0": float(theta0),
+        "mu": float(mu),
+        "label_beta0": label_beta0,
+        "strength_beta": {r: float(mu + v[i]) for i, r in enumerate(design["strengths"])},
+        "beta0": off + theta0 + c[lab],
+        "beta": mu + v[key],
+        "iterations": iterations,
+        "log_loss_before": before,
+        "log_loss_after": log_loss(logits(w), y),
+    }
+
+
+def calibrated_labels(result):
+    """Map each fitted prior label to the ``SCALE`` label nearest its fitted σ(β₀)."""
+    out = {}
+    for label, b0 in result["label_beta0"].items():
+        p = 1.0 / (1.0 + math.exp(-b0))
+        out[label] = min(SCALE, key=lambda s: abs(LABEL_TO_DECIMAL[s] - p))
+    return out
+
+
+def apply_fit(networks, design, result):
+    """
+    Return copies of ``networks`` with fitted ``edge_strengths`` and
+    recalibrated ``priors``. In every fitted network, each edge whose entered
+    strength was seen in the fit takes that strength's fitted value, and each
+    hypothesis whose prior label was seen takes that label's calibrated one.
+    Hypotheses without a prior are left without one.
+    """
+    out = [dict(net) for net in networks]
+    relabel = calibrated_labels(result)
+    fitted = {net_idx for net_idx, _ in design["hyp_refs"]}
+    for net_idx in sorted(fitted):
+        net = out[net_idx]
+        _, _, edge_strengths = load_parameters(net)
+        strengths = dict(edge_strengths)
+        for conn in net.get("connections", []):
+            u, v = conn["source"], conn["target"]
+            beta = result["strength_beta"].get(entered_strength(edge_strengths, u, v))
+            if beta is not None:
+                strengths[(u, v)] = round(math.exp(beta), 4)
+        priors = dict(net.get("priors") or {})
+        for hy in net.get("hypotheses", []):
+            label = priors.get(hy["id"])
+            if label in LABEL_TO_DECIMAL and label in relabel:
+                priors[hy["id"]] = relabel[label]
+        net["priors"] = priors
+        net["edge_strengths"] = dump_edge_strengths(strengths)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit edge strengths from resolved outcomes")
+    parser.add_argument("inputs", nargs="+", help="network JSON files with an 'outcomes' map")
+    parser.add_argument("--out-dir", default=None, help="write fitted copies here (default: in place)")
+    parser.add_argument("--l2", type=float, default=1.0, help="ridge strength on per-label and per-strength deviations")
+    parser.add_argument("--max-iter", type=int, default=500)
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in args.inputs]
+    networks = [json.loads(p.read_text(encoding="utf-8")) for p in paths]
+    design = build_design(networks)
+    result = fit(design, l2=args.l2, max_iter=args.max_iter)
+    fitted = apply_fit(networks, design, result)
+
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    for path, net in zip(paths, fitted):
+        target = out_dir / path.name if out_dir else path
+        target.write_text(json.dumps(net, indent=2), encoding="utf-8")
+
+    print(f"Fitted {len(design['y'])} hypotheses / {len(design['x'])} edges "
+          f"in {result['iterations']} iterations")
+    print(f"Global prior bias θ₀ = {result['theta0']:+.3f}; "
+          f"typical multiplier e^μ = {math.exp(result['mu']):.2f}")
+    for r, beta in result["strength_beta"].items():
+        print(f"  entered strength {r:g} → {math.exp(beta):.2f}")
+    for label, new in calibrated_labels(result).items():
+        print(f"  prior {label or '(none)'!r} → {new!r} (β₀ = {result['label_beta0'][label]:+.3f})")
+    print(f"Log loss {result['log_loss_before']:.4f} → {result['log_loss_after']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+"""
+Local inference service for evidence networks.
+
+A small asyncio HTTP/1.1 server (standard library only, plus the NumPy core in
+``network_model``) exposing the Builder's computations over the exported
+network JSON schema:
+
+    GET  /health
+    POST /api/score          → Calc Prior for every hypothesis
+    POST /api/truth-tables   → truth table per connected component
+    POST /api/sensitivity    → P(H) with each evidence parent clamped False/True
+    POST /api/query          → P(targets | observed nodes) for a list of queries
+
+``/api/truth-tables`` returns at most ``MAX_RESPONSE_ROWS`` rows of each
+table: page through larger ones with ``row_offset`` / ``row_limit``. Only
+``p_true`` is sent per row unless ``include_rows`` asks for the input
+assignments too.
+
+Concurrent requests are micro-batched: the batcher waits at most
+``--max-delay-ms`` for more work, then evaluates every queued network of the
+same kind in one vectorized NumPy pass. Conditional queries are vectorized
+per network, over that network's list of queries.
+
+Usage:
+    python inference_server.py --port 5000
+"""
+import argparse
+import asyncio
+import json
+import math
+from collections import defaultdict
+from http import HTTPStatus
+
+import networkx as nx
+import numpy as np
+
+from conditional import QueryEngine, QueryError
+from network_model import (
+    build_graph_from_json,
+    component_truth_specs,
+    load_parameters,
+    score_terms,
+    truth_table_bits,
+)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_RESPONSE_ROWS = 1 << 16
+
+
+class BadRequest(Exception):
+    """Raised for payloads that cannot be evaluated; mapped to HTTP 400."""
+
+
+# -----------------------------
+# Request → arrays
+# -----------------------------
+
+def validate_payload(payload):
+    """
+    Check the network schema before anything is built from it. Returns the
+    cleaned ``(data, priors, truth_probs, edge_strengths)``; raises BadRequest.
+    """
+    if not isinstance(payload, dict):
+        raise BadRequest("Request body must be a network JSON object")
+
+    data, seen = {}, set()
+    for key in ("evidence", "hypotheses"):
+        items = payload.get(key, [])
+        if not isinstance(items, list):
+            raise BadRequest(f"'{key}' must be an array")
+        data[key] = []
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+                raise BadRequest(f"Every '{key}' item needs a string 'id'")
+            if item["id"] in seen:
+                raise BadRequest(f"Duplicate node ID '{item['id']}'")
+            if not isinstance(item.get("text", ""), str):
+                raise BadRequest(f"'{item['id']}' text must be a string")
+            seen.add(item["id"])
+            data[key].append({**item, "text": item.get("text", "")})
+
+    conns = payload.get("connections", [])
+    if not isinstance(conns, list):
+        raise BadRequest("'connections' must be an array")
+    data["connections"] = []
+    for conn in conns:
+        if not isinstance(conn, dict):
+            raise BadRequest("Every connection must be an object")
+        src, dst = conn.get("source"), conn.get("target")
+        if not isinstance(src, str) or not isinstance(dst, str) or src not in seen or dst not in seen:
+            raise BadRequest(f"Connection {src!r} → {dst!r} references an unknown node")
+        data["connections"].append({"source": src, "target": dst})
+
+    for key in ("priors", "truth_probs", "edge_strengths"):
+        if not isinstance(payload.get(key) or {}, dict):
+            raise BadRequest(f"'{key}' must be an object")
+    priors, truth_probs, edge_strengths = load_parameters(payload)
+    for key, labels in (("priors", priors), ("truth_probs", truth_probs)):
+        for node_id, label in labels.items():
+            if not isinstance(label, str):
+                raise BadRequest(f"{key}[{node_id!r}] must be a scale label")
+    for (u, v), w in edge_strengths.items():
+        if w is not None and (isinstance(w, bool) or not isinstance(w, (int, float))):
+            raise BadRequest(f"edge_strengths['{u}->{v}'] must be a number")
+    return data, priors, truth_probs, edge_strengths
+
+
+def _row_window(payload):
+    """``(row_offset, row_limit, include_rows)`` of a truth-table request."""
+    offset = payload.get("row_offset", 0)
+    limit = payload.get("row_limit", MAX_RESPONSE_ROWS)
+    include_rows = payload.get("include_rows", False)
+    for key, value in (("row_offset", offset), ("row_limit", limit)):
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise BadRequest(f"'{key}' must be a non-negative integer")
+    if not 0 < limit <= MAX_RESPONSE_ROWS:
+        raise BadRequest(f"'row_limit' must be between 1 and {MAX_RESPONSE_ROWS}")
+    if not isinstance(include_rows, bool):
+        raise BadRequest("'include_rows' must be true or false")
+    return offset, limit, include_rows
+
+
+def prepare(kind, payload):
+    """Validate one network payload and flatten it into arrays for ``kind``."""
+    data, priors, truth_probs, edge_strengths = validate_payload(payload)
+    g = build_graph_from_json(data)
+    # Scores only read direct parents; tables and queries need a DAG
+    if kind in ("truth-tables", "query") and not nx.is_directed_acyclic_graph(g):
+        cycle = " → ".join(u for u, _ in nx.find_cycle(g))
+        raise BadRequest(f"Network contains a cycle: {cycle}")
+
+    if kind == "query":
+        queries = payload.get("queries")
+        if not isinstance(queries, list):
+            raise BadRequest('"queries" must be a list of {"targets": [...], "evidence": {...}} objects')
+        engine = QueryEngine(g, priors, truth_probs, edge_strengths)
+        try:
+            # Reject malformed queries here, before they reach the shared batch
+            queries = [engine.validate(q) for q in queries]
+        except QueryError as e:
+            raise BadRequest(str(e))
+        return engine, [{"targets": list(t), "evidence": ev} for t, ev in queries]
+    if kind == "truth-tables":
+        offset, limit, include_rows = _row_window(payload)
+        try:
+            specs = component_truth_specs(g, priors, edge_strengths)
+            for spec in specs:
+                # Only the requested window of rows is built and returned
+                spec["bits"] = truth_table_bits(len(spec["inputs"]), offset, offset + limit)
+                spec["row_offset"] = offset
+                spec["include_rows"] = include_rows
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return specs
+    return score_terms(g, priors, truth_probs, edge_strengths)
+
+
+# -----------------------------
+# Batched evaluation (one NumPy pass per kind)
+# -----------------------------
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def evaluate_score_batch(prepared):
+    """Concatenate every network's terms and evaluate all hypotheses at once."""
+    beta0 = np.concatenate([p[1] for p in prepared])
+    offsets = np.cumsum([0] + [len(p[0]) for p in prepared])
+    seg = np.concatenate([p[2] + off for p, off in zip(prepared, offsets)])
+    bt = np.concatenate([p[3] * p[4] for p in prepared])
+    probs = _sigmoid(beta0 + np.bincount(seg, weights=bt, minlength=len(beta0)))
+
+    results = []
+    for p, lo, hi in zip(prepared, offsets[:-1], offsets[1:]):
+        results.append({
+            "posteriors": dict(zip(p[0], probs[lo:hi].tolist())),
+        })
+    return results
+
+
+def evaluate_sensitivity_batch(prepared):
+    """Swing of each evidence → hypothesis term, evaluated for all networks at once."""
+    beta0 = np.concatenate([p[1] for p in prepared])
+    h_off = np.cumsum([0] + [len(p[0]) for p in prepared])
+    t_off = np.cumsum([0] + [len(p[2]) for p in prepared])
+    seg = np.concatenate([p[2] + off for p, off in zip(prepared, h_off)])
+    b = np.concatenate([p[3] for p in prepared])
+    t = np.concatenate([p[4] for p in prepared])
+
+    z = beta0 + np.bincount(seg, weights=b * t, minlength=len(beta0))
+    z_without = z[seg] - b * t
+    base = _sigmoid(z)
+    p_lo = _sigmoid(z_without)
+    p_hi = _sigmoid(z_without + b)
+
+    results = []
+    for i, p in enumerate(prepared):
+        hyp_ids, parents = p[0], p[5]
+        rows = []
+        for k in range(t_off[i], t_off[i + 1]):
+            local = k - t_off[i]
+            rows.append({
+                "hypothesis": hyp_ids[p[2][local]],
+                "evidence":   parents[local],
+                "p_false":    float(p_lo[k]),
+                "p_true":     float(p_hi[k]),
+                "swing":      float(p_hi[k] - p_lo[k]),
+            })
+        rows.sort(key=lambda r: abs(r["swing"]), reverse=True)
+        results.append({
+            "posteriors": dict(zip(hyp_ids, base[h_off[i]:h_off[i + 1]].tolist())),
+            "sensitivity": rows,
+        })
+    return results
+
+
+def evaluate_truth_table_batch(prepared):
+    """Stack every table's logits and push them through one sigmoid."""
+    z_parts, owners = [], []
+    for i, specs in enumerate(prepared):
+        for j, spec in enumerate(specs):
+            if spec["deepest"] is None or not spec["inputs"] or not len(spec["bits"]):
+                continue
+            z_parts.append(spec["beta0"] + spec["bits"] @ np.asarray(spec["betas"], dtype=float))
+            owners.append((i, j))
+    probs = _sigmoid(np.concatenate(z_parts)) if z_parts else np.empty(0)
+
+    tables = {owner: None for owner in owners}
+    pos = 0
+    for owner, part in zip(owners, z_parts):
+        tables[owner] = probs[pos:pos + len(part)]
+        pos += len(part)
+
+    results = []
+    for i, specs in enumerate(prepared):
+        components = []
+        for j, spec in enumerate(specs):
+            p_true = tables.get((i, j))
+            components.append({
+                "nodes":      spec["nodes"],
+                "deepest":    spec["deepest"],
+                "depth":      spec["depth"],
+                "inputs":     spec["inputs"],
+                "total_rows": 2 ** len(spec["inputs"]) if spec["deepest"] and spec["inputs"] else 0,
+                "row_offset": spec["row_offset"],
+                "p_true":     p_true.tolist() if p_true is not None else [],
+            })
+            if spec["include_rows"]:
+                components[-1]["rows"] = spec["bits"].tolist() if p_true is not None else []
+        results.append({"components": components})
+    return results
+
+
+def evaluate_query_batch(prepared):
+    """Each network answers its own query list in one vectorized call."""
+    results = []
+    for engine, queries in prepared:
+        try:
+            answers = engine.query_batch(queries)
+        except QueryError as e:
+            # Per-network failure; the other requests in the batch still succeed
+            results.append(BadRequest(str(e)))
+            continue
+        results.append({
+            "posteriors": [
+                {t: (None if math.isnan(p) else p) for t, p in answer.items()}
+                for answer in answers
+            ],
+        })
+    return results
+
+
+EVALUATORS = {
+    "score":        evaluate_score_batch,
+    "sensitivity":  evaluate_sensitivity_batch,
+    "truth-tables": evaluate_truth_table_batch,
+    "query":        evaluate_query_batch,
+}
+
+
+# -----------------------------
+# Micro-batcher
+# -----------------------------
+
+class MicroBatcher:
+    """
+    Collect concurrent requests for up to ``max_delay`` seconds (or
+    ``max_batch`` items) and evaluate each kind in a single vectorized call.
+    """
+
+    def __init__(self, max_batch=256, max_delay=0.002):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, kind, payload):
+        # Validation runs per request so one bad network cannot fail a batch,
+        # and off the event loop since building truth tables is CPU-heavy
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(None, prepare, kind, payload)
+        fut = loop.create_future()
+        await self._queue.put((kind, prepared, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            by_kind = defaultdict(list)
+            for item in batch:
+                by_kind[item[0]].append(item)
+            for kind, items in by_kind.items():
+                futures = [fut for _, _, fut in items]
+                try:
+                    results = await loop.run_in_executor(
+                        None, EVALUATORS[kind], [prepared for _, prepared, _ in items]
+                    )
+                except Exception as e:
+                    for fut in futures:
+                        if not fut.done():
+                            fut.set_exception(e)
+                    continue
+                for fut, result in zip(futures, results):
+                    if fut.done():
+                        continue
+                    if isinstance(result, Exception):
+                        fut.set_exception(result)
+                    else:
+                        fut.set_result(result)
+
+
+# -----------------------------
+# Minimal HTTP/1.1 front end
+# -----------------------------
+
+ROUTES = {
+    "/api/score":        "score",
+    "/api/truth-tables": "truth-tables",
+    "/api/sensitivity":  "sensitivity",
+    "/api/query":        "query",
+}
+
+
+def _response(status, body=None):
+    payload = b"" if body is None else json.dumps(body).encode("utf-8")
+    head = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(payload)}",
+        "Access-Control-Allow-Origin: *",
+        "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+        "Access-Control-Allow-Headers: Content-Type",
+    ]
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload
+
+
+async def dispatch(batcher, method, path, body):
+    """Route one request; returns ``(HTTPStatus, json_body)``."""
+    path = path.split("?", 1)[0]
+    if method == "OPTIONS":
+        return HTTPStatus.NO_CONTENT, None
+    if method == "GET" and path == "/health":
+        return HTTPStatus.OK, {"status": "ok"}
+    if path not in ROUTES:
+        return HTTPStatus.NOT_FOUND, {"message": f"No route for {path}"}
+    if method != "POST":
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"message": "Use POST"}
+    try:
+        payload = json.loads(body or b"{}")
+        return HTTPStatus.OK, await batcher.submit(ROUTES[path], payload)
+    except json.JSONDecodeError as e:
+        return HTTPStatus.BAD_REQUEST, {"message": f"Invalid JSON: {e}"}
+    except BadRequest as e:
+        return HTTPStatus.BAD_REQUEST, {"message": str(e)}
+
+
+async def handle_connection(batcher, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, path, version = request_line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {"message": "Bad request line"}))
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get("content-length", 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {"message": "Invalid Content-Length"}))
+                break
+            if length > MAX_BODY_BYTES:
+                writer.write(_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"message": "Body too large"}))
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            try:
+                status, result = await dispatch(batcher, method.upper(), path, body)
+            except Exception as e:
+                status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {"message": str(e) or "Internal Server Error"}
+            writer.write(_response(status, result))
+            await writer.drain()
+
+            keep_alive = (
+                headers.get("connection", "").lower() != "close"
+                and version.upper() == "HTTP/1.1"
+            )
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=5000, max_batch=256, max_delay=0.002):
+    batcher = MicroBatcher(max_batch=max_batch, max_delay=max_delay)
+    batcher.start()
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(batcher, r, w), host, port
+    )
+    print(f"Inference service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_delay_ms / 1000.0))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Layered (Sugiyama-style) layout computed in Python for the network view.
+
+vis.js' own ``hierarchical`` layout runs in the browser on every render,
+which locks the page for seconds on large graphs. Here the coordinates are
+computed once per network structure and handed to PyVis as fixed x/y
+positions:
+
+1. Layering: each node sits on the row of its depth (longest path from a
+   source), taken from :class:`reachability.ReachabilityIndex`.
+2. Edges that skip a few rows are split by dummy nodes, one per skipped
+   row. Longer edges connect directly, which caps the dummy count on deep
+   graphs at the cost of ignoring their crossings.
+3. Crossing reduction: alternating down/up barycenter sweeps. The order with
+   the fewest crossings is kept.
+4. Coordinates: each row is placed as close as possible (least squares) to
+   the mean x of its neighbours, subject to a minimum node spacing. This is
+   solved exactly with pool-adjacent-violators in linear time.
+
+Components are laid out independently and placed side by side.
+"""
+import hashlib
+import json
+
+LEVEL_SEPARATION = 150
+NODE_SPACING = 350
+COMPONENT_SPACING = 200
+SWEEPS = 4
+MAX_DUMMY_SPAN = 3       # edges spanning more rows than this get no dummies
+COORD_PASSES = 4
+
+
+def structure_fingerprint(data_json):
+    """Hash of node IDs and connections only; text and parameters do not move nodes."""
+    ids = sorted(n["id"] for part in ("evidence", "hypotheses") for n in data_json.get(part, []))
+    edges = sorted((c["source"], c["target"]) for c in data_json.get("connections", []))
+    return hashlib.sha1(json.dumps([ids, edges]).encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Crossing reduction
+# -----------------------------
+
+def _count_crossings(upper, lower, down):
+    """Crossings between two adjacent rows (Fenwick-tree inversion count)."""
+    pos = {n: i for i, n in enumerate(lower)}
+    targets = []
+    for n in upper:
+        targets.extend(sorted(pos[c] for c in down[n] if c in pos))
+    tree = [0] * (len(lower) + 1)
+    crossings = 0
+    for seen, t in enumerate(targets):
+        # Earlier edges that end to the right of t cross this one
+        i, le = t + 1, 0
+        while i:
+            le += tree[i]
+            i -= i & -i
+        crossings += seen - le
+        i = t + 1
+        while i <= len(lower):
+            tree[i] += 1
+            i += i & -i
+    return crossings
+
+
+def _total_crossings(rows, down):
+    return sum(_count_crossings(rows[i], rows[i + 1], down) for i in range(len(rows) - 1))
+
+
+def _barycenter_sweep(rows, neighbours, pos, step):
+    """Reorder each row by the mean position of its neighbours (rows above if ``step`` is 1)."""
+    order = range(1, len(rows)) if step == 1 else range(len(rows) - 2, -1, -1)
+    for r in order:
+        def key(n):
+            adj = neighbours[n]
+            return sum(pos[m] for m in adj) / len(adj) if adj else pos[n]
+
+        rows[r].sort(key=key)
+        for i, n in enumerate(rows[r]):
+            pos[n] = i
+
+
+# -----------------------------
+# Coordinate assignment
+# -----------------------------
+
+def _pack(targets, spacing):
+    """
+    Least-squares x positions closest to ``targets`` with gaps ≥ ``spacing``,
+    keeping the order. Substituting z_i = x_i - i·spacing turns the spacing
+    constraint into z non-decreasing, i.e. isotonic regression.
+    """
+    blocks = []   # [sum, count]
+    for i, t in enumerate(targets):
+        blocks.append([t - i * spacing, 1])
+        while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+            s, c = blocks.pop()
+            blocks[-1][0] += s
+            blocks[-1][1] += c
+    xs = []
+    for s, c in blocks:
+        xs.extend([s / c] * c)
+    return [z + i * spacing for i, z in enumerate(xs)]
+
+
+def _assign_x(rows, up, down, spacing):
+    x = {n: i * spacing for row in rows for i, n in enumerate(row)}
+    for _ in range(COORD_PASSES):
+        for r_order, neighbours in ((range(1, len(rows)), up), (range(len(rows) - 2, -1, -1), down)):
+            for r in r_order:
+                row = rows[r]
+                targets = []
+                for n in row:
+                    adj = neighbours[n]
+                    targets.append(sum(x[m] for m in adj) / len(adj) if adj else x[n])
+                for n, xn in zip(row, _pack(targets, spacing)):
+                    x[n] = xn
+    return x
+
+
+# -----------------------------
+# Layout
+# -----------------------------
+
+def _layout_component(nodes, g, depth):
+    n_rows = max(depth[n] for n in nodes) + 1
+    rows = [[] for _ in range(n_rows)]
+    up = {n: [] for n in nodes}
+    down = {n: [] for n in nodes}
+    for n in nodes:   # topological order gives a sensible starting order
+        rows[depth[n]].append(n)
+
+    for u in nodes:
+        for v in g.successors(u):
+            prev = u
+            span = depth[v] - depth[u]
+            for r in range(depth[u] + 1, depth[v] if span <= MAX_DUMMY_SPAN else 0):
+                dummy = ("__dummy__", u, v, r)
+                rows[r].append(dummy)
+                up[dummy], down[dummy] = [prev], []
+                down[prev].append(dummy)
+                prev = dummy
+            down[prev].append(v)
+            up[v].append(prev)
+
+    pos = {n: i for row in rows for i, n in enumerate(row)}
+    best = [list(row) for row in rows]
+    best_crossings = _total_crossings(rows, down)
+    for _ in range(SWEEPS):
+        if best_crossings == 0:
+            break
+        _barycenter_sweep(rows, up, pos, 1)
+        _barycenter_sweep(rows, down, pos, -1)
+        crossings = _total_crossings(rows, down)
+        if crossings < best_crossings:
+            best, best_crossings = [list(row) for row in rows], crossings
+
+    x = _assign_x(best, up, down, NODE_SPACING)
+    return {n: (x[n], depth[n] * LEVEL_SEPARATION) for n in nodes}
+
+
+def layered_layout(g, reach):
+    """Map every node of ``g`` to fixed ``(x, y)`` canvas coordinates."""
+    positions = {}
+    offset = 0.0
+    for nodes in reach.components:
+        comp = _layout_component(nodes, g, reach.depth)
+        left = min(x for x, _ in comp.values())
+        right = max(x for x, _ in comp.values())
+        for n, (x, y) in comp.items():
+            positions[n] = (x - left + offset, y)
+        offset += right - left + NODE_SPACING + COMPONENT_SPACING
+    # Centre the drawing on the origin, where vis.js puts its initial view
+    shift = (offset - NODE_SPACING - COMPONENT_SPACING) / 2 if positions else 0.0
+    return {n: (round(x - shift, 1), y) for n, (x, y) in positions.items()}
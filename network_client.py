@@ -0,0 +1,351 @@
+"""
+Python client for the networks REST API in ``server/index.js``.
+
+One pooled ``httpx.Client`` keeps connections alive across requests, and
+bulk helpers fan requests out over a thread pool no wider than the
+connection pool, so at most ``concurrency`` requests are in flight at once.
+
+- ``create_nodes`` / ``create_edges``: chunks of ``BULK_CHUNK`` items sent
+  concurrently to ``/nodes/bulk`` and ``/edges/bulk``, falling back to one
+  request per item on servers without the bulk routes
+- ``update_nodes`` / ``update_edges`` / ``delete_*``: concurrent versions of
+  the per-item routes
+- ``push_graph``: uploads a whole network into the node and edge stores. The
+  server assigns new node IDs, so edges are remapped before they are sent
+- ``upload_networks`` / ``download_networks``: many ``/api/networks``
+  documents at once. A single network travels as one request, which is the
+  fast path for large networks
+
+``to_server`` / ``from_server`` convert between the Builder's
+``network_data`` JSON (with ``priors``, ``truth_probs`` and
+``edge_strengths``) and the server's node/edge shape. A node's
+``prior_probability`` is the hypothesis prior or the evidence
+truth-probability as a decimal. A hypothesis's stated ``likelihood`` label
+travels as its own field. An edge's ``weight`` is its strength (odds
+multiplier).
+
+Usage:
+    python network_client.py upload networks/*.json --concurrency 16
+    python network_client.py download --out-dir pulled/
+"""
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import httpx
+
+from network_model import LABEL_TO_DECIMAL, dump_edge_strengths, load_parameters
+
+DEFAULT_BASE_URL = "http://localhost:4000"
+BULK_CHUNK = 1000
+
+
+# -----------------------------
+# Models (server node/edge shape)
+# -----------------------------
+
+class Node(NamedTuple):
+    id: Optional[str]
+    description: str = ""
+    prior_probability: Optional[float] = None
+    group: Optional[str] = None        # kept by /api/networks; dropped by POST /nodes
+    likelihood: Optional[str] = None   # likewise; a hypothesis's stated SCALE label
+
+    @classmethod
+    def from_json(cls, d):
+        return cls(d.get("id"), d.get("description") or "", d.get("prior_probability"),
+                   d.get("group"), d.get("likelihood"))
+
+    def to_json(self):
+        d = self._asdict()
+        for key in ("group", "likelihood"):
+            if d[key] is None:
+                del d[key]
+        return d
+
+
+class Edge(NamedTuple):
+    id: Optional[str]
+    source: str
+    target: str
+    weight: Optional[float] = None
+
+    @classmethod
+    def from_json(cls, d):
+        return cls(d.get("id"), d["source"], d["target"], d.get("weight"))
+
+    def to_json(self):
+        return self._asdict()
+
+
+class Network(NamedTuple):
+    id: Optional[str]
+    name: str
+    nodes: List[Node]
+    edges: List[Edge]
+
+    @classmethod
+    def from_json(cls, d):
+        return cls(
+            d.get("id"),
+            d.get("name") or "",
+            [Node.from_json(n) for n in d.get("nodes") or []],
+            [Edge.from_json(e) for e in d.get("edges") or []],
+        )
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "nodes": [n.to_json() for n in self.nodes],
+            "edges": [e.to_json() for e in self.edges],
+        }
+
+
+# -----------------------------
+# Conversion to/from the Builder's network_data
+# -----------------------------
+
+def _nearest_label(p):
+    if p is None:
+        return None
+    return min(LABEL_TO_DECIMAL, key=lambda label: abs(LABEL_TO_DECIMAL[label] - p))
+
+
+def to_server(data_json, name="", network_id=None):
+    """Builder JSON (``evidence``/``hypotheses``/``connections`` + parameters) → :class:`Network`."""
+    priors, truth_probs, edge_strengths = load_parameters(data_json)
+    nodes = [
+        Node(ev["id"], ev.get("text", ""), LABEL_TO_DECIMAL.get(truth_probs.get(ev["id"])), "evidence")
+        for ev in data_json.get("evidence", [])
+    ] + [
+        Node(hy["id"], hy.get("text", ""), LABEL_TO_DECIMAL.get(priors.get(hy["id"])), "hypothesis",
+             hy.get("likelihood") or None)
+        for hy in data_json.get("hypotheses", [])
+    ]
+    # Edge IDs come from the connection's position: parallel connections
+    # between the same two nodes would collide on a source->target ID
+    edges = [
+        Edge(f"e{i}", c["source"], c["target"], edge_strengths.get((c["source"], c["target"])))
+        for i, c in enumerate(data_json.get("connections", []))
+    ]
+    return Network(network_id, name, nodes, edges)
+
+
+def from_server(network):
+    """
+    :class:`Network` → Builder JSON. Probabilities snap to the nearest
+    ``SCALE`` label. Nodes without a ``group`` count as evidence when
+    nothing points at them, otherwise as hypotheses.
+    """
+    targets = {e.target for e in network.edges}
+    data = {"evidence": [], "hypotheses": [], "connections": [],
+            "priors": {}, "truth_probs": {}, "edge_strengths": {}}
+    for n in network.nodes:
+        group = n.group or ("hypothesis" if n.id in targets else "evidence")
+        label = _nearest_label(n.prior_probability)
+        if group == "evidence":
+            data["evidence"].append({"id": n.id, "text": n.description})
+            if label:
+                data["truth_probs"][n.id] = label
+        else:
+            hy = {"id": n.id, "text": n.description}
+            if n.likelihood:
+                hy["likelihood"] = n.likelihood
+            data["hypotheses"].append(hy)
+            if label:
+                data["priors"][n.id] = label
+    strengths = {}
+    for e in network.edges:
+        data["connections"].append({"source": e.source, "target": e.target})
+        if e.weight is not None:
+            strengths[(e.source, e.target)] = e.weight
+    data["edge_strengths"] = dump_edge_strengths(strengths)
+    return data
+
+
+# -----------------------------
+# Client
+# -----------------------------
+
+class NetworksClient:
+    def __init__(self, base_url=DEFAULT_BASE_URL, concurrency=16, timeout=30.0):
+        self.concurrency = concurrency
+        self._bulk_routes = True   # cleared after a 404 from an older server
+        self._http = httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    def close(self):
+        self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, method, path, body=None):
+        resp = self._http.request(method, path, json=body)
+        resp.raise_for_status()
+        return resp.json() if resp.status_code != 204 and resp.content else None
+
+    def _map(self, fn, items):
+        """``fn`` over ``items`` with at most ``concurrency`` requests in flight, results in order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+    # -----------------------------
+    # Per-item routes
+    # -----------------------------
+
+    def list_nodes(self):
+        return [Node.from_json(d) for d in self._request("GET", "/nodes")]
+
+    def create_node(self, node):
+        body = {"description": node.description, "prior_probability": node.prior_probability}
+        return Node.from_json(self._request("POST", "/nodes", body))
+
+    def update_node(self, node_id, **changes):
+        return Node.from_json(self._request("PATCH", f"/nodes/{node_id}", changes))
+
+    def delete_node(self, node_id):
+        self._request("DELETE", f"/nodes/{node_id}")
+
+    def list_edges(self):
+        return [Edge.from_json(d) for d in self._request("GET", "/edges")]
+
+    def create_edge(self, edge):
+        body = {"source": edge.source, "target": edge.target, "weight": edge.weight}
+        return Edge.from_json(self._request("POST", "/edges", body))
+
+    def update_edge(self, edge_id, **changes):
+        return Edge.from_json(self._request("PATCH", f"/edges/{edge_id}", changes))
+
+    def delete_edge(self, edge_id):
+        self._request("DELETE", f"/edges/{edge_id}")
+
+    # -----------------------------
+    # Bulk per-item operations
+    # -----------------------------
+
+    def _create_bulk(self, path, items, body, model, create_one):
+        items = list(items)
+        chunks = [items[i:i + BULK_CHUNK] for i in range(0, len(items), BULK_CHUNK)]
+        if self._bulk_routes:
+            try:
+                created = self._map(lambda chunk: self._request("POST", path, [body(x) for x in chunk]), chunks)
+                return [model.from_json(d) for chunk in created for d in chunk]
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code != 404:
+                    raise
+                self._bulk_routes = False
+        return self._map(create_one, items)
+
+    def create_nodes(self, nodes):
+        """Create ``nodes`` concurrently; returns the created nodes (server IDs) in input order."""
+        return self._create_bulk(
+            "/nodes/bulk", nodes,
+            lambda n: {"description": n.description, "prior_probability": n.prior_probability},
+            Node, self.create_node,
+        )
+
+    def create_edges(self, edges):
+        return self._create_bulk(
+            "/edges/bulk", edges,
+            lambda e: {"source": e.source, "target": e.target, "weight": e.weight},
+            Edge, self.create_edge,
+        )
+
+    def update_nodes(self, changes):
+        """``changes`` maps node ID → dict of fields to patch."""
+        return self._map(lambda item: self.update_node(item[0], **item[1]), changes.items())
+
+    def update_edges(self, changes):
+        return self._map(lambda item: self.update_edge(item[0], **item[1]), changes.items())
+
+    def delete_nodes(self, node_ids):
+        self._map(self.delete_node, node_ids)
+
+    def delete_edges(self, edge_ids):
+        self._map(self.delete_edge, edge_ids)
+
+    def push_graph(self, network):
+        """
+        Upload ``network`` through ``/nodes`` and ``/edges``. Returns
+        ``(created, id_map)``, where ``created`` uses the server's node IDs
+        and ``id_map`` maps each local node ID to its server ID.
+        """
+        created_nodes = self.create_nodes(network.nodes)
+        id_map = {n.id: c.id for n, c in zip(network.nodes, created_nodes)}
+        created_edges = self.create_edges(
+            e._replace(source=id_map[e.source], target=id_map[e.target]) for e in network.edges
+        )
+        return network._replace(nodes=created_nodes, edges=created_edges), id_map
+
+    def pull_graph(self, name=""):
+        """The server's per-item node and edge stores as one :class:`Network`."""
+        nodes, edges = self._map(lambda fn: fn(), [self.list_nodes, self.list_edges])
+        return Network(None, name, nodes, edges)
+
+    # -----------------------------
+    # Whole-network routes
+    # -----------------------------
+
+    def list_networks(self):
+        return [Network.from_json(d) for d in self._request("GET", "/api/networks")]
+
+    def get_network(self, network_id):
+        return Network.from_json(self._request("GET", f"/api/networks/{network_id}"))
+
+    def save_network(self, network):
+        """Create ``network`` (when it has no ``id``) or replace it; returns the stored copy."""
+        if network.id is None:
+            return Network.from_json(self._request("POST", "/api/networks", network.to_json()))
+        return Network.from_json(self._request("PUT", f"/api/networks/{network.id}", network.to_json()))
+
+    def upload_networks(self, networks):
+        return self._map(self.save_network, networks)
+
+    def download_networks(self, network_ids):
+        return self._map(self.get_network, network_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk sync networks with the REST API")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=16)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    up = sub.add_parser("upload", help="upload Builder JSON files as networks")
+    up.add_argument("inputs", nargs="+")
+
+    down = sub.add_parser("download", help="download networks as Builder JSON")
+    down.add_argument("ids", nargs="*", help="network IDs (default: all)")
+    down.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+
+    with NetworksClient(args.base_url, args.concurrency) as client:
+        if args.command == "upload":
+            paths = [Path(p) for p in args.inputs]
+            networks = [to_server(json.loads(p.read_text(encoding="utf-8")), p.stem) for p in paths]
+            for path, stored in zip(paths, client.upload_networks(networks)):
+                print(f"{path} → {stored.id} ({len(stored.nodes)} nodes, {len(stored.edges)} edges)")
+        else:
+            networks = client.download_networks(args.ids) if args.ids else client.list_networks()
+            out_dir = Path(args.out_dir)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            for net in networks:
+                target = out_dir / f"{net.id}.json"
+                target.write_text(json.dumps({"name": net.name, **from_server(net)}, indent=2), encoding="utf-8")
+                print(f"{net.id} → {target}")
+
+
+if __name__ == "__main__":
+    main()
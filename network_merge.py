@@ -0,0 +1,258 @@
+"""
+Merge several extracted networks, collapsing near-duplicate nodes.
+
+Node ``text`` fields are reduced to character shingles, summarised with
+MinHash signatures and bucketed with LSH banding, so candidate duplicates
+are found in roughly linear time instead of comparing every pair. Each
+candidate pair is confirmed with exact Jaccard similarity, clusters are
+formed with union-find, and connections plus ``priors`` / ``truth_probs`` /
+``edge_strengths`` are rewired onto one node per cluster.
+
+Usage:
+    python network_merge.py a.json b.json c.json -o merged.json --threshold 0.6
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+
+from network_model import SCALE, dump_edge_strengths, load_parameters
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+# -----------------------------
+# Shingling + MinHash
+# -----------------------------
+
+def shingles(text, k=5):
+    """Character k-shingles of lower-cased, punctuation-free text."""
+    norm = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+    if len(norm) <= k:
+        return {norm} if norm else set()
+    return {norm[i:i + k] for i in range(len(norm) - k + 1)}
+
+
+def _shingle_hashes(sh):
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in sh),
+        dtype=np.int64,
+        count=len(sh),
+    ) % MERSENNE_PRIME
+
+
+class MinHasher:
+    """``num_perm`` universal hash functions h(x) = (a·x + b) mod p."""
+
+    def __init__(self, num_perm=128, seed=7):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+
+    def signature(self, sh):
+        if not sh:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.int64)
+        x = _shingle_hashes(sh)
+        return ((np.outer(x, self.a) + self.b) % MERSENNE_PRIME).min(axis=0)
+
+
+def jaccard(a, b):
+    # Blank texts say nothing about each other, so they are never similar
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# -----------------------------
+# LSH index
+# -----------------------------
+
+class LSHIndex:
+    """
+    Band the MinHash signatures into ``bands`` × ``rows``; items sharing any
+    band bucket become candidates. Items are only compared within the same
+    ``group`` (evidence vs hypothesis).
+    """
+
+    def __init__(self, num_perm=128, bands=32, seed=7):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = defaultdict(list)
+        self.shingles = []
+
+    def add(self, group, text):
+        """
+        Index one text; returns its integer handle. Texts without shingles
+        are kept out of the buckets, so they always stay singletons.
+        """
+        sh = shingles(text)
+        handle = len(self.shingles)
+        self.shingles.append(sh)
+        if not sh:
+            return handle
+        sig = self.hasher.signature(sh)
+        for band in range(self.bands):
+            key = (group, band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+            self.buckets[key].append(handle)
+        return handle
+
+    def cluster(self, threshold):
+        """
+        Union-find roots after linking items whose exact shingle Jaccard is at
+        least ``threshold``. Within a bucket each item is checked only against
+        one representative per cluster already seen there, so large groups of
+        duplicates stay linear rather than quadratic.
+        """
+        uf = _UnionFind(len(self.shingles))
+        checked = set()
+        for members in self.buckets.values():
+            if len(members) < 2:
+                continue
+            reps = [members[0]]
+            for item in members[1:]:
+                root = uf.find(item)
+                if any(uf.find(r) == root for r in reps):
+                    continue
+                for rep in reps:
+                    pair = (rep, item)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if jaccard(self.shingles[rep], self.shingles[item]) >= threshold:
+                        uf.union(rep, item)
+                        break
+                else:
+                    reps.append(item)
+        return [uf.find(h) for h in range(len(self.shingles))]
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+# -----------------------------
+# Merge
+# -----------------------------
+
+def _median_label(labels):
+    idx = sorted(SCALE.index(lbl) for lbl in labels if lbl in SCALE)
+    return SCALE[idx[len(idx) // 2]] if idx else ""
+
+
+def merge_networks(networks, threshold=0.6, num_perm=128, bands=32):
+    """
+    Merge exported network dicts into one, collapsing near-duplicate nodes.
+
+    Returns ``(merged, mapping)`` where ``mapping[(network_index, old_id)]`` is
+    the node's ID in ``merged``. Merged parameters take the median qualitative
+    label and the geometric mean of edge multipliers; edges that would close a
+    cycle are dropped so the result stays a DAG.
+    """
+    index = LSHIndex(num_perm, bands)
+    nodes = []   # handle → (net_idx, id, group, item)
+    for net_idx, net in enumerate(networks):
+        for key, group in (("evidence", "evidence"), ("hypotheses", "hypothesis")):
+            for item in net.get(key, []):
+                index.add(group, item.get("text", ""))
+                nodes.append((net_idx, item["id"], group, item))
+
+    clusters = defaultdict(list)
+    for handle, root in enumerate(index.cluster(threshold)):
+        clusters[root].append(handle)
+
+    params = [load_parameters(net) for net in networks]
+    merged = {"evidence": [], "hypotheses": [], "connections": [],
+              "priors": {}, "truth_probs": {}, "edge_strengths": {}}
+    mapping = {}
+    counters = {"evidence": 0, "hypothesis": 0}
+    for root in sorted(clusters):
+        members = clusters[root]
+        group = nodes[root][2]
+        counters[group] += 1
+        new_id = f"{'E' if group == 'evidence' else 'H'}{counters[group]}"
+        # Keep the longest wording as the representative text
+        text = max((nodes[h][3].get("text", "") for h in members), key=len)
+        for h in members:
+            mapping[(nodes[h][0], nodes[h][1])] = new_id
+
+        if group == "evidence":
+            merged["evidence"].append({"id": new_id, "text": text})
+            label = _median_label(params[nodes[h][0]][1].get(nodes[h][1]) for h in members)
+            if label:
+                merged["truth_probs"][new_id] = label
+        else:
+            likelihood = _median_label(nodes[h][3].get("likelihood", "") for h in members)
+            merged["hypotheses"].append({"id": new_id, "text": text, "likelihood": likelihood})
+            label = _median_label(params[nodes[h][0]][0].get(nodes[h][1]) for h in members)
+            if label:
+                merged["priors"][new_id] = label
+
+    log_r = defaultdict(list)
+    order = []
+    for net_idx, net in enumerate(networks):
+        for conn in net.get("connections", []):
+            u = mapping.get((net_idx, conn["source"]))
+            v = mapping.get((net_idx, conn["target"]))
+            if u is None or v is None or u == v:
+                continue
+            if (u, v) not in log_r:
+                order.append((u, v))
+            r = params[net_idx][2].get((conn["source"], conn["target"]))
+            log_r[(u, v)].append(math.log(r) if r and r > 0 else None)
+
+    dag = nx.DiGraph()
+    edge_strengths = {}
+    for u, v in order:
+        if dag.has_node(v) and dag.has_node(u) and nx.has_path(dag, v, u):
+            continue
+        dag.add_edge(u, v)
+        merged["connections"].append({"source": u, "target": v})
+        logs = [x for x in log_r[(u, v)] if x is not None]
+        if logs:
+            edge_strengths[(u, v)] = round(math.exp(sum(logs) / len(logs)), 4)
+    merged["edge_strengths"] = dump_edge_strengths(edge_strengths)
+    return merged, mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge networks, collapsing near-duplicate nodes")
+    parser.add_argument("inputs", nargs="+", help="network JSON files")
+    parser.add_argument("-o", "--output", default="merged_network.json")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Jaccard similarity to merge at")
+    args = parser.parse_args()
+
+    networks = []
+    for path in args.inputs:
+        with open(path, "r", encoding="utf-8") as f:
+            networks.append(json.load(f))
+    merged, _ = merge_networks(networks, threshold=args.threshold)
+    before = sum(len(n.get("evidence", [])) + len(n.get("hypotheses", [])) for n in networks)
+    after = len(merged["evidence"]) + len(merged["hypotheses"])
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+    print(f"Merged {before} nodes into {after}; wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Headless evaluation of the logistic evidence-weighting rule.
+
+Everything here works on the plain network JSON schema (``evidence``,
+``hypotheses``, ``connections`` plus the optional ``priors``,
+``truth_probs`` and ``edge_strengths`` maps) so it can be shared by the
+Streamlit Builder (``ui.py``) and headless tools such as the inference
+service.
+"""
+import hashlib
+import json
+import math
+
+import networkx as nx
+import numpy as np
+
+from reachability import ReachabilityIndex
+
+# -----------------------------
+# Common Variables
+# -----------------------------
+
+SCALE = [
+    "Remote Chance",
+    "Highly Unlikely",
+    "Unlikely",
+    "Realistic Possibility",
+    "Likely or Probable",
+    "Highly Likely",
+    "Almost Certain",
+]
+
+LABEL_TO_PERCENT = {
+    "Remote Chance":         5,
+    "Highly Unlikely":       15,
+    "Unlikely":              30,
+    "Realistic Possibility": 45,
+    "Likely or Probable":    65,
+    "Highly Likely":         85,
+    "Almost Certain":        97.5,
+}
+
+LABEL_TO_DECIMAL = {
+    "Remote Chance":         0.05,
+    "Highly Unlikely":       0.15,
+    "Unlikely":              0.30,
+    "Realistic Possibility": 0.45,
+    "Likely or Probable":    0.65,
+    "Highly Likely":         0.85,
+    "Almost Certain":        0.975,
+}
+
+# Truth tables enumerate 2^m rows; refuse anything larger than this
+MAX_TRUTH_TABLE_INPUTS = 20
+
+
+# -----------------------------
+# Scalar helpers
+# -----------------------------
+
+def sigmoid(z: float) -> float:
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def logit(p: float) -> float:
+    # Clamp so "Almost Certain"/"Remote Chance" never hit ±inf
+    p_c = max(min(p, 0.9999), 0.0001)
+    return math.log(p_c / (1.0 - p_c))
+
+
+def edge_beta(r) -> float:
+    # βᵢ = ln(rᵢ); missing or non-positive multipliers contribute nothing
+    if r is None or r <= 0:
+        return 0.0
+    return math.log(r)
+
+
+# -----------------------------
+# JSON ⇄ graph / parameters
+# -----------------------------
+
+def build_graph_from_json(data_json):
+    g = nx.DiGraph()
+    for ev in data_json["evidence"]:
+        g.add_node(ev["id"], group="evidence", description=ev["text"], likelihood="")
+    for hy in data_json["hypotheses"]:
+        g.add_node(hy["id"], group="hypothesis", description=hy["text"], likelihood=hy.get("likelihood",""))
+    for conn in data_json["connections"]:
+        g.add_edge(conn["source"], conn["target"])
+    return g
+
+
+def network_fingerprint(data_json, keys=("evidence", "hypotheses", "connections")):
+    """Stable hash of the given parts of a network, used to key derived caches."""
+    payload = json.dumps([data_json.get(k, []) for k in keys], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def parse_edge_strengths(raw):
+    """Convert exported ``{"U->V": w}`` keys back to ``{(U, V): w}``."""
+    es = {}
+    for k, v in (raw or {}).items():
+        if isinstance(k, tuple):
+            es[k] = v
+        elif "->" in k:
+            u, v_str = k.split("->", 1)
+            es[(u, v_str)] = v
+    return es
+
+
+def dump_edge_strengths(edge_strengths):
+    """Convert ``{(U, V): w}`` to JSON-friendly ``{"U->V": w}``."""
+    return {f"{u}->{v}": w for (u, v), w in edge_strengths.items()}
+
+
+def load_parameters(parsed):
+    """Return ``(priors, truth_probs, edge_strengths)`` from an exported network."""
+    return (
+        dict(parsed.get("priors") or {}),
+        dict(parsed.get("truth_probs") or {}),
+        parse_edge_strengths(parsed.get("edge_strengths")),
+    )
+
+
+# -----------------------------
+# Calc Prior (logistic rule over evidence parents)
+# -----------------------------
+
+def calc_prior(g, node_id, priors, truth_probs, edge_strengths):
+    """
+    P(H) = σ(β₀ + Σ βᵢ·tᵢ) over the evidence parents of ``node_id``, where
+    tᵢ is the evidence truth-probability. Returns None when H has no prior.
+    """
+    p0 = LABEL_TO_DECIMAL.get(priors.get(node_id, ""), None)
+    if p0 is None:
+        return None
+    z = logit(p0)
+    for parent in g.predecessors(node_id):
+        if g.nodes[parent]["group"] == "evidence":
+            b_i = edge_beta(edge_strengths.get((parent, node_id), None))
+            t_i = LABEL_TO_DECIMAL.get(truth_probs.get(parent, ""), 0.0)
+            z += b_i * t_i
+    return sigmoid(z)
+
+
+def score_terms(g, priors, truth_probs, edge_strengths):
+    """
+    Flatten the Calc Prior computation into arrays for vectorized evaluation.
+
+    Returns ``(hyp_ids, beta0, seg, b, t, parents)``: one ``beta0`` per scored
+    hypothesis and one ``(seg, b, t, parents)`` entry per evidence → hypothesis
+    term, where ``seg`` indexes into ``hyp_ids``. Hypotheses without a prior
+    are left out, matching :func:`calc_prior`.
+    """
+    hyp_ids, beta0 = [], []
+    seg, b, t, parents = [], [], [], []
+    for node_id in g.nodes:
+        if g.nodes[node_id]["group"] != "hypothesis":
+            continue
+        p0 = LABEL_TO_DECIMAL.get(priors.get(node_id, ""), None)
+        if p0 is None:
+            continue
+        idx = len(hyp_ids)
+        hyp_ids.append(node_id)
+        beta0.append(logit(p0))
+        for parent in g.predecessors(node_id):
+            if g.nodes[parent]["group"] != "evidence":
+                continue
+            seg.append(idx)
+            b.append(edge_beta(edge_strengths.get((parent, node_id), None)))
+            t.append(LABEL_TO_DECIMAL.get(truth_probs.get(parent, ""), 0.0))
+            parents.append(parent)
+    return (
+        hyp_ids,
+        np.asarray(beta0, dtype=float),
+        np.asarray(seg, dtype=np.intp),
+        np.asarray(b, dtype=float),
+        np.asarray(t, dtype=float),
+        parents,
+    )
+
+
+def evaluate_terms(beta0, seg, b, t):
+    """Vectorized σ(β₀ + Σ βᵢ·tᵢ) for every segment in one pass."""
+    z = beta0 + np.bincount(seg, weights=b * t, minlength=len(beta0))
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def sensitivity_terms(beta0, seg, b, t):
+    """
+    For every term, P(H) with that evidence clamped False and clamped True
+    (all other evidence left at its truth-probability). Returns ``(p_lo, p_hi)``.
+    """
+    z = beta0 + np.bincount(seg, weights=b * t, minlength=len(beta0))
+    z_without = z[seg] - b * t
+    p_lo = 1.0 / (1.0 + np.exp(-z_without))
+    p_hi = 1.0 / (1.0 + np.exp(-(z_without + b)))
+    return p_lo, p_hi
+
+
+# -----------------------------
+# Truth tables per connected component
+#    (treat ancestor hypotheses like evidence)
+# -----------------------------
+
+def component_truth_specs(g, priors, edge_strengths, reach=None):
+    """
+    Describe the truth table of every connected component.
+
+    Each spec is a dict with ``nodes``, ``hypotheses``, ``deepest``, ``depth``,
+    ``inputs`` (ancestors of the deepest hypothesis, in topological order),
+    ``beta0`` and ``betas`` (one βᵢ per input; 0 for non-parents), and
+    ``cyclic``. ``deepest`` is None when the component has no hypotheses or
+    contains a cycle. Pass a cached ReachabilityIndex as ``reach`` to skip
+    rebuilding it.
+    """
+    if reach is None:
+        reach = ReachabilityIndex(g)
+    specs = []
+    for comp_idx, comp_nodes in enumerate(reach.components):
+        comp_hypotheses = [n for n in comp_nodes if g.nodes[n]["group"] == "hypothesis"]
+        spec = {
+            "nodes": comp_nodes,
+            "hypotheses": comp_hypotheses,
+            "cyclic": comp_idx in reach.cyclic,
+            "deepest": None,
+            "depth": None,
+            "inputs": [],
+            "beta0": 0.0,
+            "betas": [],
+        }
+        specs.append(spec)
+        if not comp_hypotheses or spec["cyclic"]:
+            continue
+
+        deepest_hyp = max(comp_hypotheses, key=lambda h: reach.depth[h])
+        input_nodes = reach.ancestors(deepest_hyp)
+
+        p0 = LABEL_TO_DECIMAL.get(priors.get(deepest_hyp, ""), 0.5)
+        direct = {
+            parent: edge_beta(edge_strengths.get((parent, deepest_hyp), 1.0))
+            for parent in g.predecessors(deepest_hyp)
+        }
+        spec.update(
+            deepest=deepest_hyp,
+            depth=reach.depth[deepest_hyp],
+            inputs=input_nodes,
+            beta0=logit(p0),
+            betas=[direct.get(n, 0.0) for n in input_nodes],
+        )
+    return specs
+
+
+def truth_table_bits(m, start=0, stop=None):
+    """
+    All 2^m assignments, in ``itertools.product([False, True], repeat=m)``
+    order, or only rows ``start:stop`` of them.
+    """
+    if m > MAX_TRUTH_TABLE_INPUTS:
+        raise ValueError(f"Truth table over {m} inputs exceeds the {MAX_TRUTH_TABLE_INPUTS}-input limit")
+    n = 2 ** m
+    rows = np.arange(min(start, n), n if stop is None else min(stop, n), dtype=np.int64)[:, None]
+    shifts = np.arange(m - 1, -1, -1, dtype=np.int64)
+    return ((rows >> shifts) & 1).astype(bool)
+
+
+def truth_table_probs(bits, beta0, betas):
+    """P(deepest=True) for every row of ``bits``."""
+    z = beta0 + bits @ np.asarray(betas, dtype=float)
+    return 1.0 / (1.0 + np.exp(-z))
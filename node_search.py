@@ -0,0 +1,204 @@
+"""
+Inverted index over node IDs and descriptions for search-as-you-type.
+
+The index is built once per network fingerprint and then patched in place
+when single nodes are added or deleted, so every Streamlit rerun only pays
+for the query itself. All query terms must match (AND); the last term is
+treated as a prefix so partially typed words already find results. Hits
+are ranked with BM25.
+
+Ranked search caps how many tokens a prefix expands to and, for broad
+queries, scores only the candidates found through the rarest matching
+tokens, so its cost stays bounded on large networks. ``matches`` is the
+exhaustive variant for filtering: every node matching the query, unranked.
+"""
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 16
+MAX_SCORED = 1000
+MIN_PREFIX_LEN = 2
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+class NodeSearchIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)   # token → {node_id: term frequency}
+        self.vocab = []                     # sorted tokens, for prefix lookups
+        self.docs = {}                      # node_id → (group, Counter, length)
+        self.ids = defaultdict(set)         # lower-cased node_id → node_ids
+        self.fingerprint = None
+        self._total_len = 0
+
+    @classmethod
+    def from_network(cls, data_json, fingerprint=None):
+        index = cls()
+        for ev in data_json.get("evidence", []):
+            index._insert(ev["id"], ev.get("text", ""), "evidence")
+        for hy in data_json.get("hypotheses", []):
+            index._insert(hy["id"], hy.get("text", ""), "hypothesis")
+        # Bulk build sorts the vocabulary once instead of insort per token
+        index.vocab = sorted(index.postings)
+        index.fingerprint = fingerprint
+        return index
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, node_id):
+        return node_id in self.docs
+
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+
+    def _insert(self, node_id, text, group):
+        counts = Counter(tokenize(node_id) + tokenize(text))
+        length = sum(counts.values())
+        self.docs[node_id] = (group, counts, length)
+        self.ids[node_id.lower()].add(node_id)
+        self._total_len += length
+        new_tokens = []
+        for token, tf in counts.items():
+            if token not in self.postings:
+                new_tokens.append(token)
+            self.postings[token][node_id] = tf
+        return new_tokens
+
+    def add(self, node_id, text, group=None):
+        if node_id in self.docs:
+            self.remove(node_id)
+        for token in self._insert(node_id, text, group):
+            bisect.insort(self.vocab, token)
+
+    def remove(self, node_id):
+        entry = self.docs.pop(node_id, None)
+        if entry is None:
+            return
+        _, counts, length = entry
+        self._total_len -= length
+        same_id = self.ids[node_id.lower()]
+        same_id.discard(node_id)
+        if not same_id:
+            del self.ids[node_id.lower()]
+        for token in counts:
+            posting = self.postings[token]
+            posting.pop(node_id, None)
+            if not posting:
+                del self.postings[token]
+                i = bisect.bisect_left(self.vocab, token)
+                if i < len(self.vocab) and self.vocab[i] == token:
+                    del self.vocab[i]
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def _expand(self, prefix, max_expansions=MAX_PREFIX_EXPANSIONS):
+        if len(prefix) < MIN_PREFIX_LEN:
+            return [prefix] if prefix in self.postings else []
+        i = bisect.bisect_left(self.vocab, prefix)
+        out = []
+        while i < len(self.vocab) and (max_expansions is None or len(out) < max_expansions):
+            token = self.vocab[i]
+            if not token.startswith(prefix):
+                break
+            out.append(token)
+            i += 1
+        return out
+
+    def _idf(self, token):
+        n = len(self.postings.get(token, ()))
+        return math.log(1.0 + (len(self.docs) - n + 0.5) / (n + 0.5))
+
+    def _candidates(self, query, group, max_expansions):
+        """``(term_tokens, node IDs matching every term)`` for ``query``."""
+        terms = tokenize(query)
+        if not terms or not self.docs:
+            return [], set()
+
+        # Each term becomes a group of alternative tokens; prefix only for the last
+        term_tokens = [[t] if t in self.postings else [] for t in terms[:-1]]
+        term_tokens.append(self._expand(terms[-1], max_expansions))
+        if any(not tokens for tokens in term_tokens):
+            return term_tokens, set()
+
+        # Intersect starting from the rarest term
+        def term_docs(tokens):
+            if len(tokens) == 1:
+                return self.postings[tokens[0]].keys()
+            docs = set()
+            for token in tokens:
+                docs.update(self.postings[token])
+            return docs
+
+        ordered = sorted(term_tokens, key=lambda ts: sum(len(self.postings[t]) for t in ts))
+        candidates = set(term_docs(ordered[0]))
+        for tokens in ordered[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(term_docs(tokens))
+        if group is not None:
+            candidates = {n for n in candidates if self.docs[n][0] == group}
+        return term_tokens, candidates
+
+    def matches(self, query, group=None):
+        """
+        Every node ID matching ``query``, unranked and without an expansion
+        cap. None when the query has no searchable terms, i.e. no filter.
+        """
+        if not tokenize(query):
+            return None
+        return self._candidates(query, group, None)[1]
+
+    def search(self, query, limit=50, group=None):
+        """Ranked node IDs matching every term of ``query`` (last term as prefix)."""
+        term_tokens, candidates = self._candidates(query, group, MAX_PREFIX_EXPANSIONS)
+        if not candidates:
+            return []
+
+        query_lower = query.strip().lower()
+        exact = self.ids.get(query_lower, set()) & candidates
+        if len(candidates) > MAX_SCORED:
+            # Broad query: rank only the candidates reached through the rarest
+            # (highest-idf) tokens, highest term frequency first, which is
+            # where the top BM25 scores come from
+            pool = set(exact)
+            tokens = sorted({t for ts in term_tokens for t in ts}, key=lambda t: len(self.postings[t]))
+            for token in tokens:
+                posting = self.postings[token]
+                pool.update(heapq.nlargest(
+                    MAX_SCORED - len(pool),
+                    (n for n in posting if n in candidates and n not in pool),
+                    key=posting.__getitem__,
+                ))
+                if len(pool) >= MAX_SCORED:
+                    break
+            candidates = pool
+
+        avg_len = self._total_len / len(self.docs)
+        idf = {t: self._idf(t) for tokens in term_tokens for t in tokens}
+
+        def score(node_id):
+            _, counts, length = self.docs[node_id]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+            s = 0.0
+            for tokens in term_tokens:
+                s += max(
+                    idf[t] * counts[t] * (BM25_K1 + 1) / (counts[t] + norm) if counts.get(t) else 0.0
+                    for t in tokens
+                )
+            # Typing an ID should put that node first
+            if node_id.lower() == query_lower:
+                s += 100.0
+            return s
+
+        return heapq.nlargest(limit, candidates, key=score)
@@ -0,0 +1,197 @@
+"""
+Precomputed reachability for ancestor/descendant queries.
+
+Nodes are numbered component by component in topological order, and every
+node stores its ancestor and descendant sets as bitsets (Python ints)
+relative to the start of its component. One pass over the graph builds the
+index; afterwards ``is_ancestor`` is a single bit test, ``depth`` is a dict
+lookup, and ancestor/descendant sets decode in time proportional to their
+size. Numbering per component keeps each bitset no wider than its component,
+so many small components stay cheap.
+
+A graph with cycles still gets an index: nodes are then ordered by their
+strongly connected component, every member of a cycle shares the same
+ancestors and descendants (itself included) and the same depth, and the
+affected components are listed in ``cyclic`` so callers can warn about them.
+"""
+from collections import deque
+
+import networkx as nx
+
+
+def _bits(x):
+    """Yield the positions of the set bits of ``x``, lowest first."""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+class ReachabilityIndex:
+    def __init__(self, g, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.order = []          # global id → node
+        self.index = {}          # node → global id
+        self.base = []           # global id → first id of its component
+        self.comp = []           # global id → component number
+        self.components = []     # component number → [nodes in topological order]
+        self.cyclic = []         # component numbers that contain a directed cycle
+        self.depth = {}
+
+        try:
+            topo_pos = {n: (i, 0) for i, n in enumerate(nx.topological_sort(g))}
+            scc_of, looped = None, set()
+        except nx.NetworkXUnfeasible:
+            # Order by strongly connected component instead; a component is a
+            # cycle if it has several members or a self-loop
+            cond = nx.condensation(g)
+            topo_pos, scc_of, looped = {}, {}, set()
+            for i, c in enumerate(nx.topological_sort(cond)):
+                members = cond.nodes[c]["members"]
+                if len(members) > 1 or any(g.has_edge(n, n) for n in members):
+                    looped.add(c)
+                for j, n in enumerate(members):
+                    topo_pos[n] = (i, j)
+                    scc_of[n] = c
+
+        blocks = []              # [first id, end id, is a cycle] per strongly connected component
+        for comp_nodes in nx.weakly_connected_components(g):
+            start = len(self.order)
+            ordered = sorted(comp_nodes, key=topo_pos.__getitem__)
+            for n in ordered:
+                i = len(self.order)
+                self.index[n] = i
+                self.order.append(n)
+                self.base.append(start)
+                self.comp.append(len(self.components))
+                if scc_of is not None:
+                    if topo_pos[n][1] == 0:
+                        blocks.append([i, i + 1, scc_of[n] in looped])
+                    else:
+                        blocks[-1][1] = i + 1
+            if scc_of is not None and any(scc_of[n] in looped for n in ordered):
+                self.cyclic.append(len(self.components))
+            self.components.append(ordered)
+
+        n_nodes = len(self.order)
+        self.parents = [[] for _ in range(n_nodes)]
+        self.children = [[] for _ in range(n_nodes)]
+        for u, v in g.edges:
+            iu, iv = self.index[u], self.index[v]
+            self.parents[iv].append(iu)
+            self.children[iu].append(iv)
+
+        if scc_of is None:
+            self._propagate(n_nodes)
+        else:
+            self._propagate_blocks(n_nodes, blocks)
+
+    def _propagate(self, n_nodes):
+        # Forward pass: ancestors and depth; backward pass: descendants
+        self._anc = [0] * n_nodes
+        depth = [0] * n_nodes
+        for i in range(n_nodes):
+            bits, d = 0, 0
+            for p in self.parents[i]:
+                bits |= self._anc[p] | (1 << (p - self.base[i]))
+                d = max(d, depth[p] + 1)
+            self._anc[i] = bits
+            depth[i] = d
+        self._desc = [0] * n_nodes
+        for i in range(n_nodes - 1, -1, -1):
+            bits = 0
+            for c in self.children[i]:
+                bits |= self._desc[c] | (1 << (c - self.base[i]))
+            self._desc[i] = bits
+        self.depth = {self.order[i]: depth[i] for i in range(n_nodes)}
+
+    def _propagate_blocks(self, n_nodes, blocks):
+        # Same passes over strongly connected components: the members of a
+        # cycle share their ancestors, descendants and depth
+        self._anc = [0] * n_nodes
+        depth = [0] * n_nodes
+        for lo, hi, loop in blocks:
+            bits, d = 0, 0
+            for i in range(lo, hi):
+                for p in self.parents[i]:
+                    if not lo <= p < hi:
+                        bits |= self._anc[p] | (1 << (p - self.base[i]))
+                        d = max(d, depth[p] + 1)
+            if loop:
+                bits |= ((1 << (hi - lo)) - 1) << (lo - self.base[lo])
+            for i in range(lo, hi):
+                self._anc[i] = bits
+                depth[i] = d
+        self._desc = [0] * n_nodes
+        for lo, hi, loop in reversed(blocks):
+            bits = 0
+            for i in range(lo, hi):
+                for c in self.children[i]:
+                    if not lo <= c < hi:
+                        bits |= self._desc[c] | (1 << (c - self.base[i]))
+            if loop:
+                bits |= ((1 << (hi - lo)) - 1) << (lo - self.base[lo])
+            for i in range(lo, hi):
+                self._desc[i] = bits
+        self.depth = {self.order[i]: depth[i] for i in range(n_nodes)}
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def _decode(self, i, bits):
+        base = self.base[i]
+        return [self.order[base + b] for b in _bits(bits)]
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def is_ancestor(self, a, b):
+        """True if there is a directed path a → … → b."""
+        ia, ib = self.index[a], self.index[b]
+        if self.comp[ia] != self.comp[ib]:
+            return False
+        return bool(self._anc[ib] >> (ia - self.base[ib]) & 1)
+
+    def ancestors(self, node):
+        """Ancestors of ``node`` in topological order."""
+        i = self.index[node]
+        return self._decode(i, self._anc[i])
+
+    def descendants(self, node):
+        """Descendants of ``node`` in topological order."""
+        i = self.index[node]
+        return self._decode(i, self._desc[i])
+
+    def in_cycle(self, node):
+        """True if ``node``'s component contains a directed cycle."""
+        return self.comp[self.index[node]] in self.cyclic
+
+    def component(self, node):
+        """All nodes weakly connected to ``node``, in topological order."""
+        return self.components[self.comp[self.index[node]]]
+
+    def neighbourhood(self, node, k):
+        """Nodes within ``k`` hops of ``node`` ignoring edge direction."""
+        start = self.index[node]
+        seen = {start}
+        frontier = deque([(start, 0)])
+        while frontier:
+            i, d = frontier.popleft()
+            if d == k:
+                continue
+            for j in self.parents[i] + self.children[i]:
+                if j not in seen:
+                    seen.add(j)
+                    frontier.append((j, d + 1))
+        return [self.order[i] for i in sorted(seen)]
+
+    def focus(self, node, hops=0):
+        """
+        Node set for a "focus on node" view: the node, its ancestors and
+        descendants, plus anything within ``hops`` undirected hops.
+        """
+        nodes = {node, *self.ancestors(node), *self.descendants(node)}
+        if hops:
+            nodes.update(self.neighbourhood(node, hops))
+        return nodes
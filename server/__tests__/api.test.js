@@ -56,4 +56,31 @@ describe('Nodes & Edges API', () => {
     await api.delete(`/nodes/${a.id}`);
     await api.delete(`/nodes/${b.id}`);
   });
+
+  it('bulk-creates nodes and edges', async () => {
+    let res = await api.post('/nodes/bulk', [
+      { description: 'A', prior_probability: 0.1 },
+      { description: 'B', prior_probability: 0.3 },
+    ]);
+    expect(res.status).toBe(201);
+    const [a, b] = res.data;
+    expect(a.id).not.toBe(b.id);
+    expect(b.description).toBe('B');
+
+    res = await api.post('/edges/bulk', [{ source: a.id, target: b.id, weight: 2 }]);
+    expect(res.status).toBe(201);
+    expect(res.data[0].source).toBe(a.id);
+
+    // Deleting a node also removes its edges
+    await api.delete(`/nodes/${a.id}`);
+    await api.delete(`/nodes/${b.id}`);
+    res = await api.get('/edges');
+    expect(res.data.some(e => e.source === a.id)).toBe(false);
+  });
+
+  it('rejects a non-array bulk body', async () => {
+    await expect(api.post('/nodes/bulk', { description: 'X' })).rejects.toMatchObject({
+      response: { status: 400 },
+    });
+  });
 });
@@ -5,7 +5,7 @@ const { v4: uuidv4 } = require('uuid');
 
 const app = express();
 app.use(cors());
-app.use(express.json());  // built-in JSON parser
+app.use(express.json({ limit: '50mb' }));  // built-in JSON parser; whole networks can be large
 
 let nodes = [];
 let edges = [];
@@ -21,6 +21,14 @@ app.post('/nodes', (req, res) => {
   res.status(201).json(node);
 });
 
+// Bulk create: body is an array of { description, prior_probability }
+app.post('/nodes/bulk', (req, res) => {
+  if (!Array.isArray(req.body)) return res.status(400).json({ message: 'Expected an array of nodes' });
+  const created = req.body.map(({ description, prior_probability }) => ({ id: uuidv4(), description, prior_probability }));
+  nodes.push(...created);
+  res.status(201).json(created);
+});
+
 app.patch('/nodes/:id', (req, res) => {
   const node = nodes.find(n => n.id === req.params.id);
   if (!node) return res.sendStatus(404);
@@ -45,6 +53,14 @@ app.post('/edges', (req, res) => {
   res.status(201).json(edge);
 });
 
+// Bulk create: body is an array of { source, target, weight }
+app.post('/edges/bulk', (req, res) => {
+  if (!Array.isArray(req.body)) return res.status(400).json({ message: 'Expected an array of edges' });
+  const created = req.body.map(({ source, target, weight }) => ({ id: uuidv4(), source, target, weight }));
+  edges.push(...created);
+  res.status(201).json(created);
+});
+
 app.patch('/edges/:id', (req, res) => {
   const edge = edges.find(e => e.id === req.params.id);
   if (!edge) return res.sendStatus(404);
@@ -0,0 +1,81 @@
+"""
+Backtest re-runs must reuse cached scores and only score new or changed files.
+
+Run with:  python -m unittest tests.test_backtest
+"""
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from backtest import collect_rows, file_digest, load_cache
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLE = ROOT / "network_data (1).json"
+
+
+class BacktestCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.cache = self.dir / "cache.json"
+        data = json.loads(EXAMPLE.read_text(encoding="utf-8"))
+        hypotheses = [h["id"] for h in data["hypotheses"]]
+        self.paths = []
+        for i in range(3):
+            net = {**data, "analyst": f"A{i}", "outcomes": {h: (j + i) % 2 == 0 for j, h in enumerate(hypotheses)}}
+            self.paths.append(self.write(f"net{i}.json", net))
+
+    def write(self, name, net):
+        path = self.dir / name
+        path.write_text(json.dumps(net), encoding="utf-8")
+        return path
+
+    def collect(self, paths):
+        return collect_rows(paths, self.cache, workers=1)
+
+    def test_second_run_is_served_from_cache(self):
+        rows, n_cached, errors = self.collect(self.paths)
+        self.assertEqual((n_cached, errors), (0, {}))
+        self.assertTrue(rows)
+        again, n_cached, _ = self.collect(self.paths)
+        self.assertEqual(n_cached, len(self.paths))
+        self.assertEqual(again, rows)
+
+    def test_only_changed_files_are_rescored(self):
+        self.collect(self.paths)
+        net = json.loads(self.paths[0].read_text(encoding="utf-8"))
+        net["analyst"] = "renamed"
+        self.write(self.paths[0].name, net)
+        rows, n_cached, _ = self.collect(self.paths)
+        self.assertEqual(n_cached, len(self.paths) - 1)
+        self.assertIn("renamed", {r["analyst"] for r in rows if r["file"] == str(self.paths[0])})
+        # The stale entry is dropped from the cache
+        self.assertEqual(set(load_cache(self.cache)), {file_digest(p) for p in self.paths})
+
+    def test_identical_content_shares_one_entry(self):
+        copy = self.dir / "copy.json"
+        shutil.copy(self.paths[0], copy)
+        rows, _, _ = self.collect(self.paths + [copy])
+        self.assertEqual(len(load_cache(self.cache)), len(self.paths))
+
+        def rows_of(path):
+            return [{k: v for k, v in r.items() if k != "file"} for r in rows if r["file"] == str(path)]
+
+        self.assertEqual(rows_of(copy), rows_of(self.paths[0]))
+
+    def test_bad_and_missing_files_are_skipped_and_not_cached(self):
+        bad = self.dir / "bad.json"
+        bad.write_text("{not json", encoding="utf-8")
+        missing = self.dir / "missing.json"
+        rows, _, errors = self.collect(self.paths + [bad, missing])
+        self.assertEqual(set(errors), {str(bad), str(missing)})
+        self.assertEqual({r["file"] for r in rows}, {str(p) for p in self.paths})
+        self.assertNotIn(file_digest(bad), load_cache(self.cache))
+        _, n_cached, errors = self.collect(self.paths + [bad])
+        self.assertEqual((n_cached, set(errors)), (len(self.paths), {str(bad)}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Batch extraction must retry the configured number of times and resume from its checkpoint.
+
+Run with:  python -m unittest tests.test_batch_extract
+"""
+import asyncio
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from batch_extract import TokenBucket, extract_one, load_checkpoint, run_job, stub_network
+from extraction import InvalidNetwork
+
+
+class FakeClient:
+    """Async stand-in for ``openai.AsyncOpenAI``; the first ``bad`` replies are malformed."""
+
+    def __init__(self, bad=0):
+        self.bad = bad
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, temperature):
+        self.calls += 1
+        text = messages[0]["content"].split("Apply the rules to:", 1)[-1]
+        content = "{oops" if self.calls <= self.bad else json.dumps(stub_network(text))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_rejects_bad_rate_and_capacity(self):
+        for rate in (0, -1, float("nan")):
+            with self.assertRaises(ValueError):
+                TokenBucket(rate)
+        with self.assertRaises(ValueError):
+            TokenBucket(5, capacity=0.5)
+
+    def test_caps_the_rate(self):
+        async def take(n):
+            bucket = TokenBucket(rate=50, capacity=1)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            for _ in range(n):
+                await bucket.acquire()
+            return loop.time() - start
+
+        # One token up front, then one every 20 ms
+        self.assertGreaterEqual(asyncio.run(take(6)), 5 / 50 - 0.01)
+
+
+class ExtractOneTest(unittest.TestCase):
+    def extract(self, client, retries):
+        return asyncio.run(extract_one(client, TokenBucket(1000), "A. B.", "model", retries))
+
+    def test_retries_means_retries(self):
+        client = FakeClient(bad=2)
+        self.assertTrue(self.extract(client, retries=2)["evidence"])
+        self.assertEqual(client.calls, 3)
+
+    def test_zero_retries_tries_once(self):
+        client = FakeClient(bad=1)
+        with self.assertRaises(InvalidNetwork):
+            self.extract(client, retries=0)
+        self.assertEqual(client.calls, 1)
+
+
+class RunJobTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.in_dir, self.out_dir = self.dir / "in", self.dir / "out"
+        (self.in_dir / "sub").mkdir(parents=True)
+        for name in ("a.md", "b.md", "sub/c.md"):
+            (self.in_dir / name).write_text(f"The {name} van was seen. The owner left town.", encoding="utf-8")
+
+    def run_job(self, client):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(run_job(self.in_dir, self.out_dir, rate=1000, retries=0, client=client))
+
+    def test_resumes_from_checkpoint(self):
+        self.assertEqual(self.run_job(FakeClient()), {"ok": 3, "failed": 0, "skipped": 0})
+        self.assertTrue((self.out_dir / "sub" / "c.json").exists())
+
+        # Unchanged documents are skipped; an edited one is extracted again
+        (self.in_dir / "b.md").write_text("Something else happened.", encoding="utf-8")
+        client = FakeClient()
+        self.assertEqual(self.run_job(client), {"ok": 1, "failed": 0, "skipped": 2})
+        self.assertEqual(client.calls, 1)
+
+    def test_failures_are_recorded_and_retried_next_run(self):
+        counts = self.run_job(FakeClient(bad=1))
+        self.assertEqual((counts["ok"], counts["failed"]), (2, 1))
+        failed = [k for k, r in load_checkpoint(self.out_dir).items() if r["status"] == "failed"]
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(self.run_job(FakeClient()), {"ok": 1, "failed": 0, "skipped": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
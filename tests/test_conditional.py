@@ -0,0 +1,113 @@
+"""
+Conditional queries must match brute-force enumeration of the full joint distribution.
+
+Run with:  python -m unittest tests.test_conditional
+"""
+import itertools
+import math
+import random
+import unittest
+
+from conditional import QueryEngine, QueryError
+from network_model import LABEL_TO_DECIMAL, build_graph_from_json
+
+LABELS = list(LABEL_TO_DECIMAL)
+
+
+def random_network(seed, n_evidence=6, n_hypotheses=5):
+    """Random DAG whose hypotheses may also depend on earlier hypotheses."""
+    rng = random.Random(seed)
+    evidence = [f"E{i}" for i in range(n_evidence)]
+    hypotheses = [f"H{j}" for j in range(n_hypotheses)]
+    connections, strengths = [], {}
+    for j, h in enumerate(hypotheses):
+        pool = evidence + hypotheses[:j]
+        for p in rng.sample(pool, rng.randint(1, min(4, len(pool)))):
+            connections.append({"source": p, "target": h})
+            if rng.random() < 0.8:   # the rest keep the default (no effect)
+                strengths[(p, h)] = rng.choice([0.2, 0.5, 2.0, 4.0, 10.0])
+    data = {
+        "evidence": [{"id": e, "text": ""} for e in evidence],
+        "hypotheses": [{"id": h, "text": ""} for h in hypotheses],
+        "connections": connections,
+    }
+    priors = {h: rng.choice(LABELS) for h in hypotheses if rng.random() < 0.8}
+    truth_probs = {e: rng.choice(LABELS) for e in evidence}
+    return data, priors, truth_probs, strengths
+
+
+def joint_table(data, priors, truth_probs, strengths):
+    """Every assignment ``{node: bool}`` with its joint probability."""
+    nodes = [e["id"] for e in data["evidence"]] + [h["id"] for h in data["hypotheses"]]
+    parents = {h["id"]: [] for h in data["hypotheses"]}
+    for c in data["connections"]:
+        parents[c["target"]].append(c["source"])
+    rows = []
+    for values in itertools.product((False, True), repeat=len(nodes)):
+        x = dict(zip(nodes, values))
+        joint = 1.0
+        for n in nodes:
+            if n in parents:
+                p0 = LABEL_TO_DECIMAL.get(priors.get(n), 0.5)
+                z = math.log(p0 / (1 - p0)) + sum(math.log(strengths.get((q, n), 1.0)) for q in parents[n] if x[q])
+                p = 1 / (1 + math.exp(-z))
+            else:
+                p = LABEL_TO_DECIMAL[truth_probs[n]]
+            joint *= p if x[n] else 1 - p
+        rows.append((x, joint))
+    return rows
+
+
+def brute_force(rows, target, evidence):
+    """P(target | evidence) by summing the joint over every consistent assignment."""
+    num = den = 0.0
+    for x, joint in rows:
+        if all(x[n] == v for n, v in evidence.items()):
+            den += joint
+            if x[target]:
+                num += joint
+    return num / den
+
+
+class ConditionalTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        for seed in range(8):
+            data, priors, truth_probs, strengths = random_network(seed)
+            engine = QueryEngine(build_graph_from_json(data), priors, truth_probs, strengths)
+            rows = joint_table(data, priors, truth_probs, strengths)
+            rng = random.Random(seed)
+            nodes = [n["id"] for n in data["evidence"] + data["hypotheses"]]
+            queries = []
+            for _ in range(6):
+                observed = rng.sample(nodes, rng.randint(0, 4))
+                queries.append({"targets": [], "evidence": {n: rng.random() < 0.5 for n in observed}})
+            results = engine.query_batch(queries)
+            for q, posts in zip(queries, results):
+                for h, p in posts.items():
+                    expected = brute_force(rows, h, q["evidence"])
+                    self.assertAlmostEqual(p, expected, places=9, msg=f"seed {seed}: P({h} | {q['evidence']})")
+
+    def test_batched_queries_match_single_queries(self):
+        data, priors, truth_probs, strengths = random_network(3)
+        engine = QueryEngine(build_graph_from_json(data), priors, truth_probs, strengths)
+        queries = [{"targets": ["H4"], "evidence": {"E0": a, "H1": b}}
+                   for a in (False, True) for b in (False, True)]
+        batched = engine.query_batch(queries)
+        for q, posts in zip(queries, batched):
+            self.assertAlmostEqual(posts["H4"], engine.query(q["targets"], q["evidence"])["H4"], places=12)
+
+    def test_observed_target_is_its_value(self):
+        data, priors, truth_probs, strengths = random_network(0)
+        engine = QueryEngine(build_graph_from_json(data), priors, truth_probs, strengths)
+        self.assertEqual(engine.query(["H2"], {"H2": True}), {"H2": 1.0})
+
+    def test_rejects_malformed_queries(self):
+        data, priors, truth_probs, strengths = random_network(0)
+        engine = QueryEngine(build_graph_from_json(data), priors, truth_probs, strengths)
+        for q in ({"targets": ["H99"]}, {"evidence": {"E0": "yes"}}, {"targets": "H1"}, []):
+            with self.assertRaises(QueryError):
+                engine.validate(q)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Compiled CPT lookups must equal the logistic rule for every parent assignment.
+
+Run with:  python -m unittest tests.test_cpt
+"""
+import itertools
+import math
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from cpt import MAX_CPT_PARENTS, CPTCache, compile_cpt
+from network_model import LABEL_TO_DECIMAL, logit, sigmoid
+
+PARENTS = ["E1", "E2", "H0", "E3", "E4"]
+STRENGTHS = {("E1", "H1"): 4.0, ("E2", "H1"): 0.25, ("H0", "H1"): 10.0, ("E4", "H1"): 1.5}   # E3 → H1 unset
+
+
+def graph(parents=PARENTS):
+    g = nx.DiGraph()
+    for p in parents:
+        g.add_node(p, group="hypothesis" if p.startswith("H") else "evidence")
+    g.add_node("H1", group="hypothesis")
+    g.add_edges_from((p, "H1") for p in parents)
+    return g
+
+
+def logistic(prior_label, assignment, strengths=STRENGTHS):
+    """σ(logit(p₀) + Σ ln(rᵢ)·xᵢ) straight from the definition."""
+    z = logit(LABEL_TO_DECIMAL.get(prior_label, 0.5))
+    z += sum(math.log(strengths.get((p, "H1"), 1.0)) for p, x in assignment.items() if x)
+    return sigmoid(z)
+
+
+class CompiledCPTTest(unittest.TestCase):
+    def test_every_mask_matches_logistic_rule(self):
+        for label in (*LABEL_TO_DECIMAL, None):
+            priors = {"H1": label} if label else {}
+            cpt = compile_cpt(graph(), "H1", priors, STRENGTHS)
+            self.assertEqual(len(cpt), 1 << len(PARENTS))
+            for values in itertools.product((False, True), repeat=len(PARENTS)):
+                assignment = dict(zip(PARENTS, values))
+                self.assertAlmostEqual(cpt.prob(assignment), logistic(label, assignment), places=12)
+
+    def test_bit_i_is_parent_i(self):
+        cpt = compile_cpt(graph(), "H1", {"H1": "Unlikely"}, STRENGTHS)
+        for i, p in enumerate(cpt.parents):
+            self.assertEqual(cpt.mask({p: True}), 1 << i)
+            self.assertAlmostEqual(cpt.table[1 << i], logistic("Unlikely", {p: True}), places=12)
+
+    def test_batch_lookup_matches_single_lookups(self):
+        cpt = compile_cpt(graph(), "H1", {"H1": "Likely or Probable"}, STRENGTHS)
+        rng = np.random.default_rng(0)
+        # Extra columns are ignored; E4 is missing and counts as False
+        columns = ["X", "E3", "H0", "E2", "E1"]
+        bits = rng.random((64, len(columns))) < 0.5
+        expected = [cpt.prob({c: bool(v) for c, v in zip(columns, row)}) for row in bits]
+        np.testing.assert_allclose(cpt.lookup(bits, columns), expected, rtol=0, atol=1e-12)
+
+    def test_too_many_parents_is_not_compiled(self):
+        parents = [f"E{i}" for i in range(MAX_CPT_PARENTS + 1)]
+        self.assertIsNone(compile_cpt(graph(parents), "H1", {}, {}))
+
+
+class CPTCacheTest(unittest.TestCase):
+    def test_recompiles_only_changed_tables(self):
+        g = graph()
+        g.add_node("H2", group="hypothesis")
+        g.add_edge("E1", "H2")
+        cache = CPTCache()
+        self.assertEqual(sorted(cache.sync(g, {}, STRENGTHS)), ["H0", "H1", "H2"])
+        self.assertEqual(cache.sync(g, {}, STRENGTHS), [])
+        # A strength on H2's edge and a prior elsewhere leave H1 alone
+        self.assertEqual(cache.sync(g, {"H0": "Likely or Probable"}, {**STRENGTHS, ("E1", "H2"): 3.0}), ["H0", "H2"])
+        g.remove_node("H2")
+        cache.sync(g, {}, STRENGTHS)
+        self.assertNotIn("H2", cache.tables)
+        self.assertAlmostEqual(cache.get("H1").prob({"E1": True}), logistic(None, {"E1": True}), places=12)
+
+
+if __name__ == "__main__":
+    unittest.main()
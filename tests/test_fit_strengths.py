@@ -0,0 +1,85 @@
+"""
+The pooled fit must recover a known edge strength from simulated outcomes.
+
+Run with:  python -m unittest tests.test_fit_strengths
+"""
+import math
+import unittest
+
+import numpy as np
+
+from fit_strengths import apply_fit, build_design, fit, log_loss
+from network_model import LABEL_TO_DECIMAL, SCALE, logit, parse_edge_strengths
+
+TRUE_STRENGTH = 3.0
+
+
+def simulate(n_networks=800, seed=0):
+    """Networks of 6 evidence / 10 hypotheses whose outcomes follow r = 3 on every edge."""
+    rng = np.random.default_rng(seed)
+    networks, true_z = [], []
+    for _ in range(n_networks):
+        truth_probs = {f"E{i}": SCALE[rng.integers(len(SCALE))] for i in range(6)}
+        hypotheses, connections, priors, strengths, outcomes = [], [], {}, {}, {}
+        for j in range(10):
+            h = f"H{j}"
+            hypotheses.append({"id": h, "text": ""})
+            label = SCALE[rng.integers(1, len(SCALE) - 1)]
+            priors[h] = label
+            z = logit(LABEL_TO_DECIMAL[label])
+            for p in rng.choice(6, size=rng.integers(1, 4), replace=False):
+                connections.append({"source": f"E{p}", "target": h})
+                # Half the edges carry a (wrong) hand-entered 5.0, the rest the default
+                if rng.random() < 0.5:
+                    strengths[f"E{p}->{h}"] = 5.0
+                z += math.log(TRUE_STRENGTH) * LABEL_TO_DECIMAL[truth_probs[f"E{p}"]]
+            true_z.append(z)
+            outcomes[h] = bool(rng.random() < 1.0 / (1.0 + math.exp(-z)))
+        networks.append({
+            "evidence": [{"id": e, "text": ""} for e in truth_probs],
+            "hypotheses": hypotheses,
+            "connections": connections,
+            "priors": priors,
+            "truth_probs": truth_probs,
+            "edge_strengths": strengths,
+            "outcomes": outcomes,
+        })
+    return networks, np.asarray(true_z)
+
+
+class FitStrengthsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.networks, cls.true_z = simulate()
+        cls.design = build_design(cls.networks)
+        cls.result = fit(cls.design)
+
+    def test_recovers_known_strength(self):
+        for entered, beta in self.result["strength_beta"].items():
+            self.assertAlmostEqual(math.exp(beta), TRUE_STRENGTH, delta=0.5, msg=f"entered {entered}")
+
+    def test_does_not_beat_the_true_model(self):
+        # A fit that memorises outcomes scores well below the generating model
+        true_loss = log_loss(self.true_z, self.design["y"])
+        self.assertGreater(self.result["log_loss_after"], true_loss - 0.01)
+
+    def test_written_strengths_are_pooled(self):
+        fitted = apply_fit(self.networks, self.design, self.result)
+        written = {
+            w for net in fitted for w in parse_edge_strengths(net["edge_strengths"]).values()
+        }
+        self.assertLessEqual(len(written), 2)
+        for w in written:
+            self.assertAlmostEqual(w, TRUE_STRENGTH, delta=0.5)
+
+    def test_missing_prior_stays_unset(self):
+        networks = [dict(net) for net in self.networks[:50]]
+        networks[0] = {**networks[0], "priors": {k: v for k, v in networks[0]["priors"].items() if k != "H0"}}
+        design = build_design(networks)
+        fitted = apply_fit(networks, design, fit(design))
+        self.assertNotIn("H0", fitted[0]["priors"])
+        self.assertIn("H1", fitted[0]["priors"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Feeding a response in arbitrary chunks must give the same items as parsing it whole.
+
+Run with:  python -m unittest tests.test_incremental_parser
+"""
+import json
+import random
+import unittest
+from pathlib import Path
+
+from extraction import IncrementalNetworkParser, InvalidNetwork, parse_response
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLE = ROOT / "network_data (1).json"
+
+
+def _response():
+    data = json.loads(EXAMPLE.read_text(encoding="utf-8"))
+    network = {k: data[k] for k in ("evidence", "hypotheses", "connections")}
+    # Braces, brackets, quotes and escapes inside strings must not confuse the scanner
+    network["evidence"].append({"id": "E_tricky", "text": 'a "quoted" {brace} [bracket] \\ é'})
+    return json.dumps(network, indent=2, ensure_ascii=False)
+
+
+def _feed_in_chunks(parser, text, rng, max_chunk):
+    events, i = [], 0
+    while i < len(text):
+        j = i + rng.randint(1, max_chunk)
+        events += parser.feed(text[i:j])
+        i = j
+    return events
+
+
+class IncrementalParserTest(unittest.TestCase):
+    def setUp(self):
+        self.text = _response()
+        self.expected = parse_response(self.text)
+        self.items = [(k, item) for k in ("evidence", "hypotheses", "connections")
+                      for item in json.loads(self.text)[k]]
+
+    def test_random_chunks_match_whole_parse(self):
+        for seed in range(50):
+            rng = random.Random(seed)
+            parser = IncrementalNetworkParser()
+            events = _feed_in_chunks(parser, self.text, rng, max_chunk=rng.choice([1, 3, 17, 200]))
+            self.assertEqual(events, self.items, f"seed {seed}")
+            self.assertEqual(parser.text, self.text)
+            self.assertEqual(parser.close(), self.expected)
+
+    def test_code_fence_is_skipped(self):
+        parser = IncrementalNetworkParser()
+        events = _feed_in_chunks(parser, f"```json\n{self.text}\n```", random.Random(0), 5)
+        self.assertEqual(events, self.items)
+        self.assertEqual(parser.close(), self.expected)
+
+    def test_malformed_item_fails_before_the_end(self):
+        broken = self.text.replace('"E_tricky"', '"E_tricky",,', 1)
+        parser = IncrementalNetworkParser()
+        with self.assertRaises(InvalidNetwork):
+            _feed_in_chunks(parser, broken, random.Random(0), 7)
+        self.assertLess(len(parser.text), len(broken))
+
+    def test_truncated_response_does_not_close(self):
+        parser = IncrementalNetworkParser()
+        parser.feed(self.text[:-1])
+        with self.assertRaises(InvalidNetwork):
+            parser.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
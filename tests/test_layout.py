@@ -0,0 +1,91 @@
+"""
+The layered layout must put nodes on their depth row, keep them apart and untangle simple graphs.
+
+Run with:  python -m unittest tests.test_layout
+"""
+import itertools
+import random
+import unittest
+
+import networkx as nx
+
+from layout import LEVEL_SEPARATION, NODE_SPACING, layered_layout, structure_fingerprint
+from reachability import ReachabilityIndex
+
+
+def random_dag(n, p, seed):
+    rng = random.Random(seed)
+    g = nx.DiGraph()
+    g.add_nodes_from(range(n))
+    g.add_edges_from((i, j) for i in range(n) for j in range(i + 1, n) if rng.random() < p)
+    return g
+
+
+def crossings(g, pos):
+    """Crossing pairs among edges joining adjacent rows."""
+    edges = [(pos[u], pos[v]) for u, v in g.edges if pos[v][1] - pos[u][1] == LEVEL_SEPARATION]
+    count = 0
+    for (a, b), (c, d) in itertools.combinations(edges, 2):
+        if a[1] == c[1] and (a[0] - c[0]) * (b[0] - d[0]) < 0:
+            count += 1
+    return count
+
+
+class LayeredLayoutTest(unittest.TestCase):
+    def test_rows_follow_depth_and_nodes_keep_apart(self):
+        for seed in range(10):
+            g = random_dag(40, 0.06, seed)
+            reach = ReachabilityIndex(g)
+            pos = layered_layout(g, reach)
+            self.assertEqual(set(pos), set(g))
+            for n, (_, y) in pos.items():
+                self.assertEqual(y, reach.depth[n] * LEVEL_SEPARATION)
+            rows = {}
+            for n, (x, y) in pos.items():
+                rows.setdefault(y, []).append(x)
+            for xs in rows.values():
+                xs.sort()
+                for a, b in zip(xs, xs[1:]):
+                    self.assertGreaterEqual(b - a, NODE_SPACING - 0.2)
+
+    def test_components_do_not_overlap(self):
+        g = nx.DiGraph([("A", "B"), ("A", "C"), ("X", "Y"), ("X", "Z")])
+        pos = layered_layout(g, ReachabilityIndex(g))
+        left = [pos[n][0] for n in "ABC"]
+        right = [pos[n][0] for n in "XYZ"]
+        self.assertTrue(max(left) < min(right) or max(right) < min(left))
+
+    def test_untangles_a_crossed_bipartite_graph(self):
+        # Inserted in an order that crosses every edge; a planar order exists
+        g = nx.DiGraph()
+        g.add_nodes_from(["E1", "E2", "E3", "H3", "H2", "H1"])
+        g.add_edges_from([("E1", "H1"), ("E2", "H2"), ("E3", "H3"), ("E1", "H2"), ("E2", "H3")])
+        pos = layered_layout(g, ReachabilityIndex(g))
+        self.assertEqual(crossings(g, pos), 0)
+
+
+class StructureFingerprintTest(unittest.TestCase):
+    BASE = {
+        "evidence": [{"id": "E1", "text": "a"}, {"id": "E2", "text": "b"}],
+        "hypotheses": [{"id": "H1", "text": "c"}],
+        "connections": [{"source": "E1", "target": "H1"}, {"source": "E2", "target": "H1"}],
+    }
+
+    def test_ignores_text_parameters_and_order(self):
+        other = {
+            "evidence": [{"id": "E2", "text": "changed"}, {"id": "E1", "text": "a"}],
+            "hypotheses": [{"id": "H1", "text": "c", "likelihood": "Likely or Probable"}],
+            "connections": list(reversed(self.BASE["connections"])),
+            "priors": {"H1": "Unlikely"},
+        }
+        self.assertEqual(structure_fingerprint(other), structure_fingerprint(self.BASE))
+
+    def test_changes_with_structure(self):
+        fewer = {**self.BASE, "connections": self.BASE["connections"][:1]}
+        renamed = {**self.BASE, "hypotheses": [{"id": "H9", "text": "c"}]}
+        fingerprints = {structure_fingerprint(d) for d in (self.BASE, fewer, renamed)}
+        self.assertEqual(len(fingerprints), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Merging networks must collapse near-duplicate nodes and keep distinct ones apart.
+
+Run with:  python -m unittest tests.test_network_merge
+"""
+import unittest
+
+from network_merge import LSHIndex, jaccard, merge_networks, shingles
+from network_model import parse_edge_strengths
+
+NET_A = {
+    "evidence": [
+        {"id": "E1", "text": "The suspect's car was seen near the warehouse at midnight."},
+        {"id": "E2", "text": "Bank records show a large cash withdrawal on Friday."},
+    ],
+    "hypotheses": [{"id": "H1", "text": "The suspect set fire to the warehouse.", "likelihood": "Likely"}],
+    "connections": [{"source": "E1", "target": "H1"}, {"source": "E2", "target": "H1"}],
+    "priors": {"H1": "Likely"},
+    "truth_probs": {"E1": "Very Likely", "E2": "Likely"},
+    "edge_strengths": {"E1->H1": 4.0, "E2->H1": 2.0},
+}
+
+# Same story, reworded slightly and with different IDs
+NET_B = {
+    "evidence": [
+        {"id": "X9", "text": "The suspects car was seen near the warehouse around midnight!"},
+        {"id": "X7", "text": "A neighbour heard a dog barking all night."},
+    ],
+    "hypotheses": [{"id": "Y3", "text": "The suspect set fire to the warehouse", "likelihood": "Likely"}],
+    "connections": [{"source": "X9", "target": "Y3"}, {"source": "X7", "target": "Y3"}],
+    "priors": {"Y3": "Likely"},
+    "truth_probs": {"X9": "Very Likely", "X7": "Unlikely"},
+    "edge_strengths": {"X9->Y3": 16.0, "X7->Y3": 1.5},
+}
+
+
+class NetworkMergeTest(unittest.TestCase):
+    def test_near_duplicates_merge(self):
+        merged, mapping = merge_networks([NET_A, NET_B])
+        self.assertEqual(mapping[(0, "E1")], mapping[(1, "X9")])
+        self.assertEqual(mapping[(0, "H1")], mapping[(1, "Y3")])
+        self.assertEqual(len(merged["evidence"]), 3)
+        self.assertEqual(len(merged["hypotheses"]), 1)
+        self.assertEqual(len({mapping[(0, "E1")], mapping[(0, "E2")], mapping[(1, "X7")]}), 3)
+
+    def test_merged_edge_takes_geometric_mean(self):
+        merged, mapping = merge_networks([NET_A, NET_B])
+        edge = (mapping[(0, "E1")], mapping[(0, "H1")])
+        self.assertEqual(merged["connections"].count({"source": edge[0], "target": edge[1]}), 1)
+        self.assertAlmostEqual(parse_edge_strengths(merged["edge_strengths"])[edge], 8.0)
+
+    def test_groups_are_never_mixed(self):
+        # Identical text in an evidence and a hypothesis stays two nodes
+        net = {
+            "evidence": [{"id": "E1", "text": "The suspect set fire to the warehouse."}],
+            "hypotheses": [{"id": "H1", "text": "The suspect set fire to the warehouse."}],
+            "connections": [{"source": "E1", "target": "H1"}],
+        }
+        merged, mapping = merge_networks([net])
+        self.assertNotEqual(mapping[(0, "E1")], mapping[(0, "H1")])
+        self.assertEqual(len(merged["connections"]), 1)
+
+    def test_blank_nodes_stay_apart(self):
+        self.assertEqual(shingles("  ?! "), set())
+        self.assertEqual(jaccard(set(), set()), 0.0)
+        index = LSHIndex()
+        handles = [index.add("evidence", "") for _ in range(3)]
+        roots = index.cluster(0.6)
+        self.assertEqual(sorted(roots[h] for h in handles), handles)
+
+    def test_lsh_finds_copies_among_many(self):
+        index = LSHIndex()
+        base = "witness statement number {} describes a blue van parked outside"
+        handles = [index.add("evidence", base.format(i * 7919)) for i in range(200)]
+        dup = index.add("evidence", base.format(0) + ".")
+        roots = index.cluster(0.9)
+        self.assertEqual(roots[dup], roots[handles[0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
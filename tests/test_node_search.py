@@ -0,0 +1,72 @@
+"""
+Search must match every term, treat the last one as a prefix and rank with BM25.
+
+Run with:  python -m unittest tests.test_node_search
+"""
+import unittest
+
+from node_search import NodeSearchIndex
+
+NETWORK = {
+    "evidence": [
+        {"id": "E1", "text": "Fingerprints found on the window frame"},
+        {"id": "E2", "text": "Window broken from outside; glass inside the kitchen"},
+        {"id": "E3", "text": "Neighbour saw a car parked outside at night"},
+        {"id": "E12", "text": "Receipt for a window repair"},
+    ],
+    "hypotheses": [
+        {"id": "H1", "text": "Burglar entered through the kitchen window window window"},
+        {"id": "H2", "text": "The owner staged the break-in"},
+    ],
+}
+
+
+class NodeSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NodeSearchIndex.from_network(NETWORK)
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(set(self.index.search("window kitchen")), {"E2", "H1"})
+        self.assertEqual(self.index.search("window garage"), [])
+
+    def test_last_term_is_a_prefix(self):
+        self.assertEqual(set(self.index.search("win")), {"E1", "E2", "E12", "H1"})
+        self.assertEqual(set(self.index.search("kitchen win")), {"E2", "H1"})
+        # Only the last term expands
+        self.assertEqual(self.index.search("win kitchen"), [])
+
+    def test_ranking_prefers_term_frequency(self):
+        self.assertEqual(self.index.search("window")[0], "H1")
+
+    def test_ranking_prefers_shorter_docs(self):
+        # Same term frequency; BM25 length normalisation favours the shorter text
+        ranked = self.index.search("window")
+        self.assertLess(ranked.index("E12"), ranked.index("E2"))
+
+    def test_exact_id_ranks_first_case_insensitively(self):
+        self.assertEqual(self.index.search("e1")[0], "E1")
+        self.assertEqual(self.index.search("E1")[0], "E1")
+        # "e1" is also a prefix of "e12"
+        self.assertIn("E12", self.index.search("e1"))
+
+    def test_group_filter(self):
+        self.assertEqual(self.index.search("window", group="hypothesis"), ["H1"])
+        self.assertEqual(self.index.matches("window", group="evidence"), {"E1", "E2", "E12"})
+
+    def test_query_without_terms_is_no_filter(self):
+        self.assertIsNone(self.index.matches("  ?! "))
+        self.assertEqual(self.index.search("?!"), [])
+
+    def test_incremental_updates(self):
+        self.index.add("E4", "Windowsill scratched")
+        self.assertIn("E4", self.index.search("windows"))
+        self.index.remove("E4")
+        self.assertEqual(self.index.search("windows"), [])
+        self.assertNotIn("windowsill", self.index.vocab)
+        self.index.remove("E1")
+        self.assertNotIn("E1", self.index.search("e1"))
+        self.assertEqual(self.index.matches("fingerprints"), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
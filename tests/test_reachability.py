@@ -0,0 +1,92 @@
+"""
+The reachability index must agree with networkx on random graphs, with and without cycles.
+
+Run with:  python -m unittest tests.test_reachability
+"""
+import random
+import unittest
+
+import networkx as nx
+
+from reachability import ReachabilityIndex
+
+
+def random_dag(n, p, seed):
+    rng = random.Random(seed)
+    g = nx.DiGraph()
+    g.add_nodes_from(f"N{i}" for i in range(n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            if rng.random() < p:
+                g.add_edge(f"N{i}", f"N{j}")
+    # Shuffle the names so insertion order is not a topological order
+    names = [f"N{i}" for i in range(n)]
+    rng.shuffle(names)
+    return nx.relabel_nodes(g, dict(zip(g.nodes, names)))
+
+
+def looped(g):
+    """Nodes on a directed cycle (including self-loops)."""
+    return {n for scc in nx.strongly_connected_components(g)
+            if len(scc) > 1 or any(g.has_edge(m, m) for m in scc) for n in scc}
+
+
+class ReachabilityTest(unittest.TestCase):
+    def check(self, g):
+        reach = ReachabilityIndex(g)
+        on_cycle = looped(g)
+        for n in g:
+            # Members of a cycle count as their own ancestor and descendant
+            own = {n} if n in on_cycle else set()
+            self.assertEqual(set(reach.ancestors(n)), nx.ancestors(g, n) | own, n)
+            self.assertEqual(set(reach.descendants(n)), nx.descendants(g, n) | own, n)
+            self.assertEqual(set(reach.component(n)), nx.node_connected_component(g.to_undirected(), n))
+        for a in g:
+            for b in g:
+                expected = b in nx.descendants(g, a) or (a == b and a in on_cycle)
+                self.assertEqual(reach.is_ancestor(a, b), expected, (a, b))
+        return reach
+
+    def test_random_dags(self):
+        for seed in range(20):
+            g = random_dag(30, 0.08, seed)
+            reach = self.check(g)
+            self.assertEqual(reach.cyclic, [])
+            # Depth is the longest path from a root
+            for n in nx.topological_sort(g):
+                expected = max((reach.depth[p] + 1 for p in g.predecessors(n)), default=0)
+                self.assertEqual(reach.depth[n], expected)
+
+    def test_ancestors_in_topological_order(self):
+        g = random_dag(30, 0.1, 0)
+        reach = ReachabilityIndex(g)
+        pos = {n: i for i, n in enumerate(reach.order)}
+        for n in g:
+            for p, c in nx.utils.pairwise(reach.ancestors(n)):
+                self.assertFalse(nx.has_path(g, c, p))
+            self.assertEqual(reach.ancestors(n), sorted(reach.ancestors(n), key=pos.get))
+
+    def test_random_graphs_with_cycles(self):
+        for seed in range(20):
+            g = random_dag(25, 0.08, seed)
+            rng = random.Random(seed)
+            nodes = list(g)
+            for _ in range(3):
+                g.add_edge(rng.choice(nodes), rng.choice(nodes))
+            reach = self.check(g)
+            on_cycle = looped(g)
+            for n in g:
+                self.assertEqual(reach.in_cycle(n), bool(on_cycle & set(reach.component(n))))
+
+    def test_self_loop_and_disconnected(self):
+        g = nx.DiGraph([("A", "B"), ("B", "B"), ("C", "D")])
+        g.add_node("Z")
+        reach = self.check(g)
+        self.assertTrue(reach.in_cycle("A"))
+        self.assertFalse(reach.in_cycle("C"))
+        self.assertEqual(reach.ancestors("Z"), [])
+        self.assertEqual(reach.focus("D"), {"C", "D"})
+
+
+if __name__ == "__main__":
+    unittest.main()
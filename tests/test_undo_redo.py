@@ -0,0 +1,74 @@
+"""
+Undo → Redo in the Builder must give back the exact version that was undone.
+
+Run with:  python -m unittest tests.test_undo_redo
+"""
+import json
+import os
+import unittest
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from network_model import parse_edge_strengths
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLE = ROOT / "network_data (1).json"
+
+
+def _by_key(elements, key):
+    return next(el for el in elements if el.key == key)
+
+
+class UndoRedoTest(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+        self.at = AppTest.from_file(str(ROOT / "ui.py"), default_timeout=60)
+        self.at.run()
+        self.at.sidebar.radio[0].set_value("Builder").run()
+        data = json.loads(EXAMPLE.read_text(encoding="utf-8"))
+        self.at.session_state["network_data"] = {
+            k: data[k] for k in ("evidence", "hypotheses", "connections")
+        }
+        self.at.session_state["priors"] = dict(data["priors"])
+        self.at.session_state["truth_probs"] = dict(data["truth_probs"])
+        self.at.session_state["edge_strengths"] = parse_edge_strengths(data["edge_strengths"])
+        self.at.run()
+
+    def state(self):
+        ss = self.at.session_state
+        return (
+            json.dumps(ss["network_data"], sort_keys=True),
+            dict(ss["priors"]),
+            dict(ss["truth_probs"]),
+            dict(ss["edge_strengths"]),
+        )
+
+    def test_undo_then_redo_restores_exact_version(self):
+        _by_key(self.at.text_input, "new_node_id").set_value("E9")
+        _by_key(self.at.text_area, "new_node_text").set_value("New evidence")
+        self.at.button(key="FormSubmitter:add_node_form-Add Node").click().run()
+        self.assertIn("E9", [ev["id"] for ev in self.at.session_state["network_data"]["evidence"]])
+        after_add = self.state()
+        history = self.at.session_state["history"]
+        version = history.current
+        position = history.position
+
+        _by_key(self.at.button, "undo_btn").click().run()
+        self.assertNotIn("E9", [ev["id"] for ev in self.at.session_state["network_data"]["evidence"]])
+        # Reliabilities are restored, not reset to the widget default
+        self.assertEqual(
+            self.state()[2],
+            {k: v for k, v in after_add[2].items() if k != "E9"},
+        )
+
+        _by_key(self.at.button, "redo_btn").click().run()
+        self.assertEqual(self.state(), after_add)
+        history = self.at.session_state["history"]
+        self.assertIs(history.current, version)
+        self.assertEqual(history.position, position)
+        self.assertFalse(history.can_redo())
+
+
+if __name__ == "__main__":
+    unittest.main()
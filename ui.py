@@ -1,18 +1,46 @@
+import time
+_run_started = time.perf_counter()
+
 import streamlit as st
 import json
-import networkx as nx
-from pyvis.network import Network
-import pandas as pd
+import sys
 import textwrap
 import streamlit.components.v1 as components
 import tempfile
 import os
-import math
-from openai import OpenAI
-import itertools
+from contextlib import contextmanager
 from streamlit.runtime.scriptrunner.script_runner import RerunException
 from subsidary_pages import page1, page2
 
+# Heavy dependencies (pandas, pyvis, networkx/numpy, openai) are imported
+# only on the Builder path below; the info pages never load them.
+import_times = {}   # label → ms spent importing during this rerun
+
+
+@st.cache_resource
+def cold_import_times():
+    # Process-wide: how long each heavy import took the first time
+    return {}
+
+
+@contextmanager
+def import_timer(label, module):
+    cold = module not in sys.modules
+    t0 = time.perf_counter()
+    yield
+    elapsed = (time.perf_counter() - t0) * 1000
+    import_times[label] = elapsed
+    if cold:
+        cold_import_times()[label] = elapsed
+
+
+@st.cache_resource
+def get_openai_client():
+    # Built once per process and reused across reruns and sessions
+    with import_timer("openai", "openai"):
+        from openai import OpenAI
+    return OpenAI()  # reads env vars
+
 
 # 1️⃣ Page config
 st.set_page_config(
@@ -37,38 +65,34 @@ elif page == "Predicting Probabilities is Hard":
     st.stop()
 
 # -----------------------------
-# Common Variables
+# Builder-only imports
 # -----------------------------
-
-SCALE = [
-    "Remote Chance",
-    "Highly Unlikely",
-    "Unlikely",
-    "Realistic Possibility",
-    "Likely or Probable",
-    "Highly Likely",
-    "Almost Certain",
-]
-
-LABEL_TO_PERCENT = {
-    "Remote Chance":         5,
-    "Highly Unlikely":       15,
-    "Unlikely":              30,
-    "Realistic Possibility": 45,
-    "Likely or Probable":    65,
-    "Highly Likely":         85,
-    "Almost Certain":        97.5,
-}
-
-LABEL_TO_DECIMAL = {
-    "Remote Chance":         0.05,
-    "Highly Unlikely":       0.15,
-    "Unlikely":              0.30,
-    "Realistic Possibility": 0.45,
-    "Likely or Probable":    0.65,
-    "Highly Likely":         0.85,
-    "Almost Certain":        0.975,
-}
+with import_timer("pandas", "pandas"):
+    import pandas as pd
+with import_timer("pyvis", "pyvis.network"):
+    from pyvis.network import Network
+with import_timer("network_model (networkx, numpy)", "network_model"):
+    from network_model import (
+        SCALE,
+        LABEL_TO_PERCENT,
+        LABEL_TO_DECIMAL,
+        build_graph_from_json,
+        component_truth_specs,
+        dump_edge_strengths,
+        evaluate_terms,
+        network_fingerprint,
+        parse_edge_strengths,
+        score_terms,
+        truth_table_bits,
+        truth_table_probs,
+    )
+    from extraction import InvalidNetwork, stream_extract
+    from edit_history import EditHistory, summarise_diff
+    from node_search import NodeSearchIndex, tokenize
+    from reachability import ReachabilityIndex
+    from layout import layered_layout, structure_fingerprint
+    from cpt import CPTCache
+    from conditional import QueryEngine, QueryError
 
 # -----------------------------
 # Helper Functions
@@ -99,6 +123,80 @@ def clean_state(g):
             del st.session_state.edge_strengths[key]
 
 
+NODE_KEYS = ("evidence", "hypotheses")
+
+
+def get_search_index(data_json):
+    # Built once per set of nodes; add/delete below patch it in place
+    fp = network_fingerprint(data_json, NODE_KEYS)
+    index = st.session_state.get("search_index")
+    if index is None or index.fingerprint != fp:
+        index = NodeSearchIndex.from_network(data_json, fp)
+        st.session_state.search_index = index
+    return index
+
+
+def get_reach_index(g, data_json):
+    # Ancestor/descendant bitsets, rebuilt only when the structure changes
+    fp = network_fingerprint(data_json)
+    index = st.session_state.get("reach_index")
+    if index is None or index.fingerprint != fp:
+        index = ReachabilityIndex(g, fp)
+        st.session_state.reach_index = index
+    return index
+
+
+def get_layout(g, reach, data_json):
+    # Fixed node coordinates, recomputed only when nodes or edges change
+    fp = structure_fingerprint(data_json)
+    cached = st.session_state.get("layout")
+    if cached is None or cached[0] != fp:
+        cached = (fp, layered_layout(g, reach))
+        st.session_state.layout = cached
+    return cached[1]
+
+
+def get_cpt_cache(g):
+    # Per-hypothesis lookup tables; sync recompiles only the hypotheses whose
+    # prior or incoming strengths changed since the last rerun
+    cache = st.session_state.setdefault("cpt_cache", CPTCache())
+    cache.sync(g, st.session_state.priors, st.session_state.edge_strengths)
+    return cache
+
+
+def node_options(g, query, limit=200):
+    # Ranked search hits when a query is typed, otherwise every node
+    if not tokenize(query):
+        return list(g.nodes)
+    return [n for n in search_index.search(query, limit) if n in g.nodes]
+
+
+def parameter_widget_keys(data_json):
+    # Exact keys of the section 4 inputs; a prefix match would also hit the
+    # "priors"/"truth_probs" dicts themselves
+    keys = {f"prior_{hy['id']}" for hy in data_json.get("hypotheses", [])}
+    keys.update(f"truth_{ev['id']}" for ev in data_json.get("evidence", []))
+    keys.update(f"weight_{c['source']}_{c['target']}" for c in data_json.get("connections", []))
+    return keys
+
+
+def restore_version(version):
+    nd, priors, truth_probs, edge_strengths = version.to_state()
+    # Drop widget state so the parameter inputs pick up the restored values
+    stale = parameter_widget_keys(st.session_state.network_data) | parameter_widget_keys(nd)
+    for key in stale:
+        st.session_state.pop(key, None)
+    st.session_state.network_data = nd
+    st.session_state.priors = priors
+    st.session_state.truth_probs = truth_probs
+    st.session_state.edge_strengths = edge_strengths
+
+
+def describe_node(g, node_id):
+    desc = g.nodes[node_id].get("description", "") if node_id in g.nodes else ""
+    return f"{node_id} — {textwrap.shorten(desc, 70)}" if desc else node_id
+
+
 # -----------------------------
 # 0) Initialize or load underlying JSON data
 # -----------------------------
@@ -109,16 +207,6 @@ if "network_data" not in st.session_state:
         "connections": []
     }
 
-def build_graph_from_json(data_json):
-    g = nx.DiGraph()
-    for ev in data_json["evidence"]:
-        g.add_node(ev["id"], group="evidence", description=ev["text"], likelihood="")
-    for hy in data_json["hypotheses"]:
-        g.add_node(hy["id"], group="hypothesis", description=hy["text"], likelihood=hy.get("likelihood",""))
-    for conn in data_json["connections"]:
-        g.add_edge(conn["source"], conn["target"])
-    return g
-
 # -----------------------------
 # 1) Rebuild graph and clean stale session_state
 # -----------------------------
@@ -131,6 +219,16 @@ if "truth_probs" not in st.session_state:
     st.session_state.truth_probs = {}   # evidence_id → qualitative truth‐prob
 if "edge_strengths" not in st.session_state:
     st.session_state.edge_strengths = {}  # (src, dst) → float multiplier
+if "history" not in st.session_state:
+    # Versions share structure, so every edit costs only what it changed
+    st.session_state.history = EditHistory.from_state(
+        st.session_state.network_data,
+        st.session_state.priors,
+        st.session_state.truth_probs,
+        st.session_state.edge_strengths,
+    )
+history = st.session_state.history
+edit_label = "Edit parameters"   # replaced by whichever edit runs below
 
 # Remove priors for hypotheses no longer in graph
 for h_id in list(st.session_state.priors):
@@ -160,49 +258,38 @@ with col_text:
 with col_file:
     uploaded_json = st.file_uploader("📂 …or upload pre-made JSON", type="json")
 
-client = OpenAI()  # reads env vars
-
-PROMPT_TEMPLATE = textwrap.dedent("""
-You will receive an analytic text.
-Task: extract **evidence** items and **hypotheses** items, then return
-ONE JSON object with exactly three arrays:
-
-{
-  "evidence":   [ {"id": "E1", "text": "..."} ],
-  "hypotheses": [ {"id": "H1", "text": "...", "likelihood": "Likely or Probable"} ],
-  "connections": [ {"source": "E1", "target": "H1"},
-                   {"source": "H1", "target": "H2"} ]
-}
-
-Rules:
-• Evidence IDs start with "E"; hypothesis IDs start with "H".
-• A connection links an evidence to a hypothesis OR a hypothesis to another hypothesis.
-• Include a "likelihood" field only if the source text states one value must be one of:
-    Remote Chance, Highly Unlikely, Unlikely, Realistic Possibility,
-    Likely or Probable, Highly Likely, Almost Certain.
-
-Return **nothing** except this JSON.
-
-Apply the rules to:
-{payload}
-""")
-
 if run_gpt and user_text:
-    with st.spinner("Sending to GPT and awaiting response …"):
-        prompt = PROMPT_TEMPLATE.format(payload=user_text)
-        try:
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-            )
-            raw_json = resp.choices[0].message.content.strip()
-            st.subheader("Raw JSON from GPT")
-            st.code(raw_json, language="json")
-            parsed = json.loads(raw_json)
-            st.session_state.network_data = parsed
-        except Exception as e:
-            st.error(f"GPT call / JSON parse failed: {e}")
+    # Stream the completion and show each item as soon as its JSON closes
+    st.subheader("Extracted items (streaming)")
+    status = st.empty()
+    live = {"evidence": st.empty(), "hypotheses": st.empty(), "connections": st.empty()}
+    partial = {"evidence": [], "hypotheses": [], "connections": []}
+    status.info("Sending to GPT and awaiting first items …")
+    try:
+        for key, item in stream_extract(get_openai_client(), user_text):
+            if key == "raw":
+                with st.expander("Raw JSON from GPT"):
+                    st.code(item, language="json")
+                continue
+            if key == "network":
+                st.session_state.network_data = item
+                edit_label = "GPT extraction"
+                status.success(
+                    f"✅ Extracted {len(item['evidence'])} evidence, "
+                    f"{len(item['hypotheses'])} hypotheses, "
+                    f"{len(item['connections'])} connections"
+                )
+                continue
+            partial[key].append(item)
+            live[key].dataframe(pd.DataFrame(partial[key]), use_container_width=True)
+            status.info(f"Receiving … {sum(len(v) for v in partial.values())} items so far")
+    except InvalidNetwork as e:
+        status.error(f"GPT returned malformed JSON: {e}")
+        if getattr(e, "raw", None):
+            with st.expander("Raw JSON from GPT"):
+                st.code(e.raw, language="json")
+    except Exception as e:
+        status.error(f"GPT call failed: {e}")
 
 elif uploaded_json is not None:
     try:
@@ -228,13 +315,9 @@ elif uploaded_json is not None:
         # --- load edge_strengths if present ---
         if "edge_strengths" in parsed:
             # keys were saved as "U->V"; convert back to tuple
-            es = {}
-            for k, v in parsed["edge_strengths"].items():
-                if "->" in k:
-                    u, v_str = k.split("->", 1)
-                    es[(u, v_str)] = v
-            st.session_state.edge_strengths = es
+            st.session_state.edge_strengths = parse_edge_strengths(parsed["edge_strengths"])
 
+        edit_label = "Load JSON"
         st.success("✅ Loaded network + parameters from JSON")
 
     except Exception as e:
@@ -258,6 +341,18 @@ for key in list(st.session_state.edge_strengths):
 # -----------------------------
 st.header("Build / Edit Network Data")
 
+# Undo / redo over the versioned history
+col_undo, col_redo, col_hist = st.columns([1, 1, 4])
+if col_undo.button("↶ Undo", disabled=not history.can_undo(), key="undo_btn"):
+    restore_version(history.undo())
+    st.rerun()
+if col_redo.button("↷ Redo", disabled=not history.can_redo(), key="redo_btn"):
+    restore_version(history.redo())
+    st.rerun()
+history_caption = col_hist.empty()   # filled in once this rerun's edits are committed
+
+search_index = get_search_index(st.session_state.network_data)
+
 # 3A) Add Node
 with st.expander("➕ Add Node", expanded=False):
     with st.form("add_node_form"):
@@ -277,6 +372,9 @@ with st.expander("➕ Add Node", expanded=False):
                 st.session_state.network_data["hypotheses"].append(entry)
             else:
                 st.session_state.network_data["evidence"].append(entry)
+            search_index.add(new_id, new_txt, new_type)
+            search_index.fingerprint = network_fingerprint(st.session_state.network_data, NODE_KEYS)
+            edit_label = f"Add {new_type} {new_id}"
             st.success(f"Added {new_type} '{new_id}'.")
 
 # **Rebuild graph so downstream expanders see the new node**
@@ -286,10 +384,18 @@ clean_state(g)
 # 3B) Delete Node
 with st.expander("➖ Delete Node", expanded=False):
     if g.nodes:
-        del_node_id = st.selectbox("Choose node to delete", list(g.nodes), key="del_node_select")
+        del_query = st.text_input("🔎 Search nodes", key="del_node_query")
+        del_node_id = st.selectbox(
+            "Choose node to delete",
+            node_options(g, del_query),
+            format_func=lambda n: describe_node(g, n),
+            key="del_node_select",
+        )
         with st.form("delete_node_form"):
             del_sub = st.form_submit_button("Delete Node")
-        if del_sub:
+        if del_sub and del_node_id is None:
+            st.error("No node matches the search.")
+        elif del_sub:
             st.session_state.network_data["evidence"] = [
                 ev for ev in st.session_state.network_data["evidence"] if ev["id"] != del_node_id
             ]
@@ -300,6 +406,9 @@ with st.expander("➖ Delete Node", expanded=False):
                 c for c in st.session_state.network_data["connections"]
                 if c["source"] != del_node_id and c["target"] != del_node_id
             ]
+            search_index.remove(del_node_id)
+            search_index.fingerprint = network_fingerprint(st.session_state.network_data, NODE_KEYS)
+            edit_label = f"Delete node {del_node_id}"
             st.success(f"Deleted node '{del_node_id}' (and its connections).")
 
 # Rebuild again before edge forms
@@ -311,12 +420,19 @@ clean_state(g)
 # 3C) Add Edge
 with st.expander("➕ Add Edge", expanded=False):
     if len(g.nodes) >= 2:
-        # Everything in one form
+        # Search boxes sit outside the form so results update as you type
+        col_src_q, col_dst_q = st.columns(2)
+        src_query = col_src_q.text_input("🔎 Search 'From' nodes", key="edge_src_query")
+        dst_query = col_dst_q.text_input("🔎 Search 'To' nodes", key="edge_dst_query")
         with st.form("add_edge_form"):
-            src = st.selectbox("From", list(g.nodes), key="edge_src")
-            dst = st.selectbox("To",   list(g.nodes), key="edge_dst")
+            src = st.selectbox("From", node_options(g, src_query),
+                               format_func=lambda n: describe_node(g, n), key="edge_src")
+            dst = st.selectbox("To",   node_options(g, dst_query),
+                               format_func=lambda n: describe_node(g, n), key="edge_dst")
             add_e_sub = st.form_submit_button("Add Edge")
-        if add_e_sub:
+        if add_e_sub and (src is None or dst is None):
+            st.error("Pick both endpoints (a search may have no matches).")
+        elif add_e_sub:
             exists = any(
                 c["source"] == src and c["target"] == dst
                 for c in st.session_state.network_data["connections"]
@@ -327,6 +443,7 @@ with st.expander("➕ Add Edge", expanded=False):
                 st.session_state.network_data["connections"].append({
                     "source": src, "target": dst
                 })
+                edit_label = f"Add edge {src} → {dst}"
                 st.success(f"Added edge {src} → {dst}.")
 
     else:
@@ -352,6 +469,7 @@ with st.expander("➖ Delete Edge", expanded=False):
                 c for c in st.session_state.network_data["connections"]
                 if not (c["source"] == u and c["target"] == v)
             ]
+            edit_label = f"Delete edge {u} → {v}"
             st.success(f"Deleted edge {u} → {v}.")
     else:
         st.write("No edges to delete.")
@@ -431,6 +549,20 @@ with st.expander("🔗 Edge strength (odds multipliers)", expanded=False):
             key=f"weight_{u}_{v}"
         )
 
+# Record this rerun's edits as one version (no-op when nothing changed)
+history.commit(
+    edit_label,
+    st.session_state.network_data,
+    st.session_state.priors,
+    st.session_state.truth_probs,
+    st.session_state.edge_strengths,
+)
+pos, total = history.position
+history_caption.caption(
+    f"Version {pos}/{total} · {history.label}"
+    + (f" ({summarise_diff(history.diff())})" if pos > 1 else "")
+)
+
 # Confirmation that state has been updated
 st.success("💾 All user inputs stored in session_state (`priors`, `truth_probs`, `edge_strengths`) ")
 
@@ -439,12 +571,18 @@ st.success("💾 All user inputs stored in session_state (`priors`, `truth_probs
 # -----------------------------
 st.header("Network Tables")
 
-def sigmoid(z: float) -> float:
-    return 1.0 / (1.0 + math.exp(-z))
-
 # Rebuild g to be sure it’s up to date
 g = build_graph_from_json(st.session_state.network_data)
 
+# Calc Prior for every hypothesis in one vectorized pass (tables + colours)
+hyp_ids, beta0, seg, b, t, _ = score_terms(
+    g,
+    st.session_state.priors,
+    st.session_state.truth_probs,
+    st.session_state.edge_strengths,
+)
+calc_priors = dict(zip(hyp_ids, evaluate_terms(beta0, seg, b, t).tolist()))
+
 # Build Nodes DataFrame
 node_rows = []
 for node_id in g.nodes:
@@ -470,21 +608,8 @@ for node_id in g.nodes:
 
     # Compute logistic‐based “Calc Prior (%)” for hypotheses
     if grp == "hypothesis":
-        p0 = LABEL_TO_DECIMAL.get(prior_text, None)
-        if p0 is not None:
-            p0_c = max(min(p0, 0.9999), 0.0001)
-            b0 = math.log(p0_c / (1.0 - p0_c))
-            z = b0
-            for parent in g.predecessors(node_id):
-                if g.nodes[parent]["group"] == "evidence":
-                    r = st.session_state.edge_strengths.get((parent, node_id), None)
-                    if r is None or r <= 0:
-                        continue
-                    b_i = math.log(r)
-                    parent_label = st.session_state.truth_probs.get(parent, "")
-                    t_i = LABEL_TO_DECIMAL.get(parent_label, 0.0)
-                    z += b_i * t_i
-            p_h = sigmoid(z)
+        p_h = calc_priors.get(node_id)
+        if p_h is not None:
             calc_prior_pct = f"≈ {p_h * 100:.1f}%"
 
     node_rows.append({
@@ -511,6 +636,15 @@ for conn in st.session_state.network_data["connections"]:
 
 edges_df = pd.DataFrame(edge_rows)
 
+# Filter both tables through the search index
+table_query = st.text_input("🔎 Filter nodes & edges", key="table_filter")
+matches = search_index.matches(table_query)   # None when there is nothing to search for
+if matches is not None:
+    if not nodes_df.empty:
+        nodes_df = nodes_df[nodes_df["ID"].isin(matches)]
+    if not edges_df.empty:
+        edges_df = edges_df[edges_df["From"].isin(matches) | edges_df["To"].isin(matches)]
+
 with st.expander("📋 Nodes"):
     st.subheader("Nodes")
     st.dataframe(nodes_df, use_container_width=True)
@@ -525,105 +659,152 @@ with st.expander("📈 Edges"):
 # -----------------------------
 st.header("Truth Tables by Connected Component")
 
-# Build undirected connectivity
-undirected = g.to_undirected()
-components = list(nx.connected_components(undirected))
+reach = get_reach_index(g, st.session_state.network_data)
+cpt_cache = get_cpt_cache(g)
+specs = component_truth_specs(
+    g, st.session_state.priors, st.session_state.edge_strengths, reach
+)
 
-if not components:
+if not specs:
     st.write("No nodes in the network.")
 else:
-    for idx, comp_nodes in enumerate(components, start=1):
-        comp_subg = g.subgraph(comp_nodes).copy()
-
-        # Separate evidence & hypotheses in this component
-        comp_evidence = [n for n in comp_nodes if g.nodes[n]["group"] == "evidence"]
-        comp_hypotheses = [n for n in comp_nodes if g.nodes[n]["group"] == "hypothesis"]
-
+    for idx, spec in enumerate(specs, start=1):
         st.subheader(f"Component {idx}")
 
-        if not comp_hypotheses:
+        if spec["cyclic"]:
+            st.warning("⚠️ This component contains a cycle, so it has no truth table; "
+                       "remove an edge to make it acyclic.")
+            continue
+        if spec["deepest"] is None:
             st.write("No hypotheses here; skipping.")
             continue
 
-        # Compute depth within subgraph
-        depth = {}
-        for node in nx.topological_sort(comp_subg):
-            preds = list(comp_subg.predecessors(node))
-            depth[node] = 0 if not preds else max(depth[p] + 1 for p in preds)
-
-        # Choose the deepest hypothesis
-        deepest_hyp = max(comp_hypotheses, key=lambda h: depth.get(h, 0))
-        st.markdown(f"**Deepest hypothesis:** `{deepest_hyp}` (depth={depth[deepest_hyp]})")
-
-        # All ancestors of that deepest hypothesis
-        all_anc = nx.ancestors(comp_subg, deepest_hyp)
-        # Filter to those that are evidence or hypothesis
-        input_nodes = [n for n in all_anc if comp_subg.nodes[n]["group"] in ("evidence", "hypothesis")]
+        deepest_hyp = spec["deepest"]
+        st.markdown(f"**Deepest hypothesis:** `{deepest_hyp}` (depth={spec['depth']})")
 
+        input_nodes = spec["inputs"]
         if not input_nodes:
             st.write("No ancestor inputs; skipping.")
             continue
 
-        # Precompute evidence‐truth decimals
-        evidence_prob = {
-            eid: LABEL_TO_DECIMAL.get(st.session_state.truth_probs.get(eid, ""), 0.0)
-            for eid in comp_evidence
-        }
+        # Enumerate all 2^m assignments over input_nodes; P(deepest) only depends
+        # on its direct parents, so each row is a lookup in its compiled CPT
+        try:
+            bits = truth_table_bits(len(input_nodes))
+        except ValueError as e:
+            st.warning(f"⚠️ {e}; skipping this table.")
+            continue
+        cpt = cpt_cache.get(deepest_hyp)
+        if cpt is not None:
+            p_true = cpt.lookup(bits, input_nodes)
+        else:
+            p_true = truth_table_probs(bits, spec["beta0"], spec["betas"])
 
-        # Compute β₀ for deepest hypothesis
-        prior_label = st.session_state.priors.get(deepest_hyp, "")
-        p0 = LABEL_TO_DECIMAL.get(prior_label, 0.5)
-        p0_c = max(min(p0, 0.9999), 0.0001)
-        beta0 = math.log(p0_c / (1.0 - p0_c))
-
-        # Compute βᵢ for each direct parent (evidence or hypothesis) of deepest_hyp
-        direct_parents = []
-        for parent in comp_subg.predecessors(deepest_hyp):
-            r = st.session_state.edge_strengths.get((parent, deepest_hyp), 1.0)
-            b_i = math.log(r) if r > 0 else 0.0
-            direct_parents.append((parent, b_i))
-
-        # Enumerate all 2^m assignments over input_nodes
-        combos = list(itertools.product([False, True], repeat=len(input_nodes)))
-
-        rows = []
-        for combo in combos:
-            # Compute P(deepest_hyp=True | this assignment)
-            z = beta0
-            for (parent, b_i) in direct_parents:
-                if parent in input_nodes:
-                    i = input_nodes.index(parent)
-                    X_i = 1 if combo[i] else 0
-                else:
-                    X_i = 0
-                z += b_i * X_i
-            p_h_true = sigmoid(z)
-
-            # Build row dict
-            row = { node: combo[input_nodes.index(node)] for node in input_nodes }
-            row[f"P({deepest_hyp}=True) (%)"] = f"{p_h_true * 100:.2f}%"
-            rows.append(row)
-
-        df = pd.DataFrame(rows)
+        df = pd.DataFrame(bits, columns=input_nodes)
+        df[f"P({deepest_hyp}=True) (%)"] = [f"{p * 100:.2f}%" for p in p_true]
         st.dataframe(df, use_container_width=True)
 
+# -----------------------------
+# 6B) Conditional query: P(H | observed nodes)
+# -----------------------------
+st.header("Conditional Query")
+
+# Posteriors are only defined on acyclic components
+query_nodes = [n for n in g.nodes if not reach.in_cycle(n)]
+hypothesis_ids = [n for n in query_nodes if g.nodes[n]["group"] == "hypothesis"]
+if reach.cyclic:
+    st.caption("Nodes in components with a cycle are left out of queries.")
+if not hypothesis_ids:
+    st.write("Add hypotheses to query them.")
+else:
+    col_obs, col_tgt = st.columns(2)
+    observed_nodes = col_obs.multiselect(
+        "Observed nodes",
+        query_nodes,
+        format_func=lambda n: describe_node(g, n),
+        key="query_observed",
+    )
+    query_targets = col_tgt.multiselect(
+        "Target hypotheses (all if empty)",
+        hypothesis_ids,
+        format_func=lambda n: describe_node(g, n),
+        key="query_targets",
+    )
+    observations = {}
+    for n in observed_nodes:
+        observations[n] = st.radio(
+            f"`{n}` is", ["True", "False"], horizontal=True, key=f"query_value_{n}"
+        ) == "True"
+
+    # Conditioned and unconditioned posteriors in one batch call
+    targets = query_targets or hypothesis_ids
+    try:
+        engine = QueryEngine(
+            g,
+            st.session_state.priors,
+            st.session_state.truth_probs,
+            st.session_state.edge_strengths,
+            cpts=cpt_cache,
+        )
+        conditioned, baseline = engine.query_batch([
+            {"targets": targets, "evidence": observations},
+            {"targets": targets, "evidence": {}},
+        ])
+    except QueryError as e:
+        st.warning(f"⚠️ {e}")
+    else:
+        def fmt_pct(p):
+            return "impossible evidence" if p != p else f"{p * 100:.2f}%"
+
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Hypothesis":         h,
+                    "P(H | observed) (%)": fmt_pct(conditioned[h]),
+                    "P(H) (%)":           fmt_pct(baseline[h]),
+                    "Calc Prior(%)":      f"≈ {calc_priors[h] * 100:.1f}%" if h in calc_priors else "",
+                }
+                for h in targets
+            ]),
+            use_container_width=True,
+        )
+        st.caption(
+            "Exact posteriors: observed nodes are clamped and unobserved ancestors "
+            "summed out. Calc Prior instead plugs truth-probabilities into the rule."
+        )
+
 # -----------------------------
 # 7) Network Visualisation (with weight‐based edge color & thickness)
 # -----------------------------
 st.header("Network Visualisation")
 
+# Optional "focus on node" view: lineage (+ k-hop neighbourhood) as a subgraph view
+col_focus, col_hops = st.columns([3, 1])
+focus_node = col_focus.selectbox(
+    "🎯 Focus on node",
+    [None] + list(g.nodes),
+    format_func=lambda n: "(whole network)" if n is None else describe_node(g, n),
+    key="focus_node",
+)
+focus_hops = col_hops.number_input("Extra hops", min_value=0, max_value=10, value=0, key="focus_hops")
+if focus_node is not None:
+    view = g.subgraph(reach.focus(focus_node, int(focus_hops)))
+    st.caption(
+        f"Showing {view.number_of_nodes()} of {g.number_of_nodes()} nodes: "
+        f"{len(reach.ancestors(focus_node))} ancestors, "
+        f"{len(reach.descendants(focus_node))} descendants of `{focus_node}` "
+        f"(depth {reach.depth[focus_node]})."
+    )
+else:
+    view = g
+
 try:
+    # Layered layout is precomputed server-side; the browser only draws it
+    positions = get_layout(g, reach, st.session_state.network_data)
     options_dict = {
         "layout": {
             "hierarchical": {
-                "enabled": True,
-                "levelSeparation": 150,
-                "nodeSpacing": 350,
-                "treeSpacing": 200,
-                "direction": "UD",
-                "sortMethod": "directed",
-                "blockShifting": False,
-                "edgeMinimization": True
+                "enabled": False
             }
         },
         "nodes": {
@@ -650,7 +831,7 @@ try:
     tmp_net.set_options(json.dumps(options_dict))
 
     # add nodes as before
-    for n in g.nodes:
+    for n in view.nodes:
         node_data = g.nodes[n]
         desc = node_data.get("description", "")
         wrapped = textwrap.fill(desc, width=50)
@@ -658,19 +839,7 @@ try:
         prob = None
         if node_data["group"] == "hypothesis":
             # Use Calc Prior (%)
-            prior_label = st.session_state.priors.get(n, "")
-            p0 = LABEL_TO_DECIMAL.get(prior_label, None)
-            if p0 is not None:
-                p0 = max(min(p0, 0.9999), 0.0001)
-                b0 = math.log(p0 / (1 - p0))
-                z = b0
-                for parent in g.predecessors(n):
-                    if g.nodes[parent]["group"] == "evidence":
-                        r = st.session_state.edge_strengths.get((parent, n), 1.0)
-                        b_i = math.log(r) if r > 0 else 0.0
-                        t_i = LABEL_TO_DECIMAL.get(st.session_state.truth_probs.get(parent, ""), 0.0)
-                        z += b_i * t_i
-                prob = sigmoid(z)
+            prob = calc_priors.get(n)
 
         elif node_data["group"] == "evidence":
             truth_label = st.session_state.truth_probs.get(n, "")
@@ -681,6 +850,7 @@ try:
 
         label = f"{n}\n{wrapped}\n({prob_str})"
 
+        x, y = positions[n]
         tmp_net.add_node(
             n,
             label=label,
@@ -688,11 +858,14 @@ try:
             shape="box",
             font={"multi": True, "align": "left"},
             color=color,
+            x=x,
+            y=y,
+            physics=False,
         )
 
 
     # add edges with dynamic color & width
-    for u, v in g.edges:
+    for u, v in view.edges:
         w = st.session_state.edge_strengths.get((u, v), 1.0)
         if 0 < w <= 1:
             color = "red"
@@ -734,10 +907,7 @@ export_data = {
     "priors": st.session_state.priors,        # hypothesis_id → qualitative prior
     "truth_probs": st.session_state.truth_probs,  # evidence_id → qualitative truth‐prob
     # convert tuple keys to strings so JSON can encode them
-    "edge_strengths": {
-        f"{u}->{v}": w
-        for (u, v), w in st.session_state.edge_strengths.items()
-    }
+    "edge_strengths": dump_edge_strengths(st.session_state.edge_strengths),
 }
 
 # Serialize to pretty JSON
@@ -758,8 +928,38 @@ st.download_button(
 
 st.caption(f"🔄 Temp file overwritten on each run: `{tmp_path}`")
 
+# Compiled CPTs: one lookup table per hypothesis, indexed by parent bitmask.
+# The export can be large, so it is only serialized once asked for
+if st.checkbox("Export compiled CPTs", key="export_cpts"):
+    st.download_button(
+        label="Download compiled CPTs (JSON)",
+        data=json.dumps(cpt_cache.export(), indent=2),
+        file_name="compiled_cpts.json",
+        mime="application/json"
+    )
+n_tables = sum(cpt is not None for cpt in cpt_cache.tables.values())
+st.caption(
+    f"🧮 {n_tables} compiled tables; "
+    f"{len(cpt_cache.last_compiled)} recompiled on this run."
+)
+
 
 # -----------------------------
 # Footer
 # -----------------------------
+with st.expander("⏱ Load timings", expanded=False):
+    st.write(f"This rerun: **{(time.perf_counter() - _run_started) * 1000:.0f} ms** "
+             f"(imports {sum(import_times.values()):.1f} ms)")
+    st.table(pd.DataFrame(
+        [
+            {
+                "Import":          label,
+                "This rerun (ms)": round(import_times.get(label, 0.0), 2),
+                "Cold start (ms)": round(cold_ms, 1),
+            }
+            for label, cold_ms in cold_import_times().items()
+        ],
+        columns=["Import", "This rerun (ms)", "Cold start (ms)"],
+    ))
+
 st.caption("© 2025 Evidence-Network UI – Streamlit & PyVis demo")